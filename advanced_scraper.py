@@ -7,7 +7,6 @@
 
 import requests
 import json
-import time
 import random
 from urllib.parse import quote
 from datetime import datetime
@@ -16,6 +15,11 @@ import threading
 from collections import defaultdict
 import string
 import itertools
+from query_log import load_crawl_queue
+from crawl_cache import get_crawl_cache, request_songs
+from catalog import write_json
+from artifacts import build_all
+from rate_limit import AdaptiveTokenBucket
 
 class AdvancedKaraokeScraper:
     def __init__(self, max_workers=3, max_songs=15000):
@@ -26,6 +30,10 @@ class AdvancedKaraokeScraper:
         self.search_stats = defaultdict(int)
         self.lock = threading.Lock()
         self.base_url = "https://song.corp.com.tw"
+        # 所有線程共用的速率控制，依上游回應自動加速或退避
+        self.rate_controller = AdaptiveTokenBucket(rate=1, max_rate=10)
+        # 與其他爬蟲共用的回應快取，重跑時已查過的關鍵字不再連線
+        self.crawl_cache = get_crawl_cache()
         
         # 初始化session池
         for _ in range(max_workers):
@@ -182,6 +190,13 @@ class AdvancedKaraokeScraper:
         keywords = list(set(keywords))
         random.shuffle(keywords)
         
+        # 使用者實際查詢過的關鍵字 (query_log.py 產生的需求佇列) 排在最前面
+        demand_keywords = load_crawl_queue()
+        if demand_keywords:
+            demand_set = set(demand_keywords)
+            keywords = demand_keywords + [k for k in keywords if k not in demand_set]
+            print(f"📈 需求佇列優先: {len(demand_keywords)} 個關鍵字")
+        
         print(f"🎯 生成 {len(keywords)} 個關鍵字")
         return keywords
     
@@ -203,18 +218,13 @@ class AdvancedKaraokeScraper:
             
             for method_params in search_methods:
                 try:
-                    url = f"{self.base_url}/api/song.aspx"
-                    
-                    # 隨機延遲避免被封鎖
-                    time.sleep(random.uniform(0.5, 1.5))
-                    
-                    response = session.get(url, params=method_params, timeout=10)
-                    
-                    if response.status_code == 200:
-                        data = response.json()
-                        
-                        if isinstance(data, list) and data:
-                            all_results.extend(data)
+                    data = self.crawl_cache.fetch(
+                        keyword, method_params['company'], method_params['cusType'],
+                        lambda: request_songs(session, f"{self.base_url}/api/song.aspx", method_params,
+                                              self.rate_controller, timeout=10)
+                    )
+                    if data:
+                        all_results.extend(data)
                             
                 except Exception as e:
                     continue  # 如果某個方法失敗，繼續嘗試其他方法
@@ -254,11 +264,10 @@ class AdvancedKaraokeScraper:
             return f"💥 {keyword}: {str(e)}"
     
     def save_progress(self):
-        """儲存進度"""
+        """儲存進度 (先寫暫存檔再替換，API 熱更新不會讀到寫到一半的檔案)"""
         try:
             songs_list = list(self.all_songs.values())
-            with open('public/songs_simplified.json', 'w', encoding='utf-8') as f:
-                json.dump(songs_list, f, ensure_ascii=False, indent=2)
+            write_json(songs_list, 'public/songs_simplified.json')
             
             return len(songs_list)
         except Exception as e:
@@ -314,13 +323,15 @@ class AdvancedKaraokeScraper:
                         
                         # 顯示統計
                         elapsed = datetime.now() - start_time
-                        print(f"📊 進度: {completed_searches} 次搜尋，{len(self.all_songs)} 首歌曲，耗時 {elapsed}")
+                        print(f"📊 進度: {completed_searches} 次搜尋，{len(self.all_songs)} 首歌曲，耗時 {elapsed}，"
+                              f"目前速率每秒 {self.rate_controller.rate:.2f} 次")
                     
                 except Exception as e:
                     print(f"❌ 任務執行錯誤: {e}")
         
-        # 最終儲存
+        # 最終儲存，並重建壓縮檔與 manifest (爬取途中 API 會偵測到不符而改送原始檔案)
         final_count = self.save_progress()
+        build_all(names=['songs_simplified.json'])
         end_time = datetime.now()
         elapsed_time = end_time - start_time
         
@@ -336,6 +347,10 @@ class AdvancedKaraokeScraper:
         for keyword, count in top_keywords:
             print(f"   {keyword}: {count} 首")
 
+        cache_stats = self.crawl_cache.get_stats()
+        if cache_stats['enabled']:
+            print(f"\n💾 爬蟲快取命中 {cache_stats['hits']} 次，省下 {cache_stats['hits']} 個上游請求")
+
 def main():
     print("🎤 高級多線程卡拉OK歌曲爬蟲")
     print("=" * 60)
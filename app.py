@@ -1,9 +1,25 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request, send_file
 from flask_cors import CORS
-from karaoke_scraper import KaraokeScraper
+from catalog import PRIORITY_COMPANIES, flatten_song, group_rows, song_record
+from catalog_watcher import SNAPSHOT_PATH, CatalogWatcher
+from response_cache import ResponseCache, normalize_keyword
+from single_flight import SingleFlight
+from upstream_client import UpstreamError, get_client
+from pagination import iter_ndjson, page_slice, parse_limit, parse_page_args, sse_event
+from backfill import Backfiller
+from artifacts import ENCODING_SUFFIXES, PUBLIC_DIR, ArtifactManifest
+from metrics import REGISTRY, SIZE_BUCKETS, Counter, Gauge
+from rate_limit import UPSTREAM_BURST, UPSTREAM_RATE, RateLimitExceeded, create_bucket
+from circuit_breaker import STATE_VALUES, CircuitBreaker, CircuitOpenError
+from query_log import QUERY_LOG_PATH, QueryLog
 import logging
 import requests
 import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FuturesTimeoutError
 
 # 設定日誌
 logging.basicConfig(
@@ -12,44 +28,360 @@ logging.basicConfig(
 )
 
 app = Flask(__name__)
-CORS(app)  # 允許跨域請求
+CORS(app, expose_headers=['X-Total-Count', 'X-Next-Cursor'])  # 允許跨域請求
 
-# 初始化爬蟲實例
-scraper = KaraokeScraper()
-scraper.init_session()
+# 上游回應快取 (可用環境變數調整大小與有效時間)
+upstream_cache = ResponseCache(
+    max_entries=int(os.environ.get('CACHE_MAX_ENTRIES', 512)),
+    ttl=int(os.environ.get('CACHE_TTL', 300)),
+    stale_ttl=int(os.environ.get('CACHE_STALE_TTL', 1800))
+)
+
+# 合併同時間相同關鍵字的上游請求
+upstream_flight = SingleFlight()
+
+# 共用連線池的上游客戶端，在背景預熱連線 (UPSTREAM_WARMUP=0 關閉)
+upstream_client = get_client()
+if os.environ.get('UPSTREAM_WARMUP', '1') != '0':
+    threading.Thread(target=upstream_client.warm_up, name='upstream-warmup', daemon=True).start()
+
+# 上游速率限制：快取未命中的實際上游請求才消耗 token (UPSTREAM_RATE_FILE 設定時跨 worker 共用)
+upstream_limiter = create_bucket(
+    rate=UPSTREAM_RATE,
+    burst=UPSTREAM_BURST,
+    max_waiters=int(os.environ.get('UPSTREAM_MAX_WAITERS', 20)),
+    max_wait=float(os.environ.get('UPSTREAM_MAX_WAIT', 2)),
+    state_path=os.environ.get('UPSTREAM_RATE_FILE') or None
+)
+
+# 上游斷路器：連續失敗後暫停呼叫點歌王，期間直接以本地目錄回應 (速率限制拒絕不算上游故障)
+upstream_breaker = CircuitBreaker(
+    name='song.corp.com.tw',
+    failure_threshold=int(os.environ.get('BREAKER_FAILURE_THRESHOLD', 5)),
+    recovery_timeout=float(os.environ.get('BREAKER_RECOVERY_TIMEOUT', 30)),
+    ignore=(RateLimitExceeded,)
+)
+
+def guarded_upstream(fn):
+    """所有實際的上游請求都經過斷路器與速率限制"""
+    return upstream_breaker.call(lambda: upstream_limiter.call(fn))
+
+def fallback_flags(error):
+    """改用本地目錄回應時附加的原因欄位"""
+    if isinstance(error, CircuitOpenError):
+        return {'circuit_open': True}
+    return {'rate_limited': True}
+
+# 批次搜尋向上游查詢的共用執行緒池，所有批次請求合計最多 BATCH_MAX_WORKERS 個並行查詢
+BATCH_MAX_KEYWORDS = 200
+batch_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get('BATCH_MAX_WORKERS', 8)),
+    thread_name_prefix='batch'
+)
+
+# 查詢紀錄：正規化關鍵字與結果數，供 query_log.py 彙整成爬蟲佇列 (第一次查詢時才開檔，QUERY_LOG_PATH 設為空字串則關閉)
+query_log_path = os.environ.get('QUERY_LOG_PATH', QUERY_LOG_PATH)
+query_log = QueryLog(query_log_path) if query_log_path else None
+
+def record_query(keyword, result_count, offset=0, route=None):
+    """只記錄第一頁，翻頁不重複計入需求；result_count 為 None 表示上游查詢失敗"""
+    if query_log is None or offset:
+        return
+    query_log.record(keyword, result_count, route or route_label())
+
+# 混合搜尋的背景補齊：查到的新歌寫回目前快照的來源檔，再立即重建快照 (BACKFILL=off 關閉)
+# 目錄快照在載入後才綁定
+backfiller = Backfiller(
+    fetch=lambda keyword: cached_taiwan_ktv(keyword),
+    on_saved=lambda path: catalogs.reload(),
+    enabled=os.environ.get('BACKFILL', 'on').lower() not in ('0', 'off', 'false')
+)
+
+# 在背景載入本地歌曲目錄與搜尋索引 (有預先建好的快照時直接載入)，匯入 app 不必等待；
+# 檔案變更時在背景重建並替換快照 (CATALOG_RELOAD_INTERVAL=0 關閉熱更新)
+catalogs = CatalogWatcher(
+    interval=int(os.environ.get('CATALOG_RELOAD_INTERVAL', 10)),
+    on_swap=backfiller.rebind,
+    snapshot_path=os.environ.get('CATALOG_SNAPSHOT_PATH', SNAPSHOT_PATH) or None,
+    save_snapshots=os.environ.get('CATALOG_SNAPSHOT_SAVE') == '1'
+)
+
+# 請求延遲與結果數量指標 (/metrics)
+REQUEST_LATENCY = REGISTRY.histogram(
+    'karaoke_http_request_duration_seconds', 'API 請求處理耗時', ['route', 'method'])
+REQUEST_COUNT = REGISTRY.counter(
+    'karaoke_http_requests_total', 'API 請求數與狀態碼', ['route', 'method', 'status'])
+RESULT_SIZE = REGISTRY.histogram(
+    'karaoke_search_results', '每次查詢的結果筆數', ['route'], buckets=SIZE_BUCKETS)
+
+def route_label():
+    """以路由規則作為標籤，避免每個關鍵字產生不同的時間序列"""
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+@app.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request(response):
+    start = g.get('request_start')
+    if start is not None:
+        route = route_label()
+        REQUEST_LATENCY.observe(time.perf_counter() - start, route=route, method=request.method)
+        REQUEST_COUNT.inc(route=route, method=request.method, status=str(response.status_code))
+    return response
+
+def collect_service_metrics():
+    """把既有的快取、請求合併、補齊與目錄統計轉成指標"""
+    cache = upstream_cache.get_stats()
+    cache_events = Counter('karaoke_cache_events_total', '上游快取事件數', ['event'])
+    for event in ('hits', 'stale_hits', 'misses', 'evictions', 'refreshes', 'refresh_errors'):
+        cache_events.inc(cache[event], event=event)
+    cache_ratio = Gauge('karaoke_cache_hit_ratio', '上游快取命中率 (含過期回傳)')
+    cache_ratio.set(cache['hit_ratio'])
+    cache_size = Gauge('karaoke_cache_entries', '上游快取項目數')
+    cache_size.set(cache['size'])
+
+    flight = upstream_flight.get_stats()
+    coalesced = Counter('karaoke_single_flight_total', '上游請求合併統計', ['result'])
+    coalesced.inc(flight['executed'], result='executed')
+    coalesced.inc(flight['coalesced'], result='coalesced')
+
+    backfill = backfiller.get_stats()
+    backfill_events = Counter('karaoke_backfill_total', '背景補齊統計', ['event'])
+    for event, value in backfill.items():
+        backfill_events.inc(value, event=event)
+
+    catalog_stats = catalogs.get_stats()
+    catalog_songs = Gauge('karaoke_catalog_songs', '目前目錄快照的歌曲數')
+    catalog_songs.set(catalog_stats.get('songs', 0))
+    catalog_reloads = Counter('karaoke_catalog_reloads_total', '目錄熱更新次數')
+    catalog_reloads.inc(catalog_stats['reloads'])
+
+    limiter = upstream_limiter.get_stats()
+    rate_limit = Counter('karaoke_upstream_rate_limit_total', '上游速率限制結果', ['result'])
+    for result in ('granted', 'waited', 'rejected'):
+        rate_limit.inc(limiter[result], result=result)
+    rate_waiting = Gauge('karaoke_upstream_rate_limit_waiting', '等待上游額度的請求數')
+    rate_waiting.set(limiter['waiting'])
+
+    breaker = upstream_breaker.get_stats()
+    breaker_state = Gauge('karaoke_upstream_circuit_state', '上游斷路器狀態 (0=closed, 1=half_open, 2=open)')
+    breaker_state.set(STATE_VALUES[breaker['state']])
+    breaker_events = Counter('karaoke_upstream_circuit_total', '上游斷路器統計', ['event'])
+    for event in ('calls', 'failures', 'rejected', 'opened'):
+        breaker_events.inc(breaker[event], event=event)
+
+    return [cache_events, cache_ratio, cache_size, coalesced, backfill_events, catalog_songs, catalog_reloads,
+            rate_limit, rate_waiting, breaker_state, breaker_events]
+
+REGISTRY.add_collector(collect_service_metrics)
+
+def page_response(items, offset, limit, transform=None, **extra):
+    """依 cursor 回傳一頁資料；stream=1 時改以 NDJSON 逐行輸出"""
+    RESULT_SIZE.observe(len(items), route=route_label())
+    page, next_cursor = page_slice(items, offset, limit)
+
+    if request.args.get('stream') == '1':
+        headers = {'X-Total-Count': str(len(items))}
+        if next_cursor:
+            headers['X-Next-Cursor'] = next_cursor
+        return Response(iter_ndjson(page, transform), mimetype='application/x-ndjson', headers=headers)
+
+    if transform is not None:
+        page = [transform(item) for item in page]
+    return jsonify({
+        'success': True,
+        'data': page,
+        'total': len(items),
+        'next_cursor': next_cursor,
+        **extra
+    })
+
+def wants_grouped():
+    """group=1 時每首歌只回傳一筆，編號合併為統一資料庫的編號資訊格式"""
+    return request.args.get('group') == '1'
+
+def local_results(song_index, keyword):
+    """本地排序結果，依 group 參數回傳逐筆編號記錄或合併後的歌曲"""
+    if wants_grouped():
+        return song_index.ranked_songs(keyword)
+    return song_index.ranked_rows(keyword)
 
 @app.route('/api/search', methods=['GET'])
 def search():
     keyword = request.args.get('keyword', '')
     if not keyword:
         return jsonify({'error': '請輸入搜尋關鍵字'}), 400
-        
+
+    # 預設使用本地索引，明確指定 source=upstream 時才查詢點歌王
+    if request.args.get('source') == 'upstream':
+        return search_upstream(keyword)
+
+    try:
+        limit, offset = parse_page_args(request.args)
+    except ValueError:
+        return jsonify({'error': '分頁參數格式錯誤'}), 400
+
+    try:
+        snapshot = catalogs.current  # 整個請求使用同一個目錄版本
+        results = local_results(snapshot.song_index, keyword)
+        record_query(keyword, len(results), offset)
+
+        # fuzzy=1 時，找不到完全相符的結果再以錯字容忍索引補救
+        if not results and request.args.get('fuzzy') == '1':
+            songs = snapshot.fuzzy_index.search(keyword)
+            if wants_grouped():
+                results = [song_record(song) for song in songs]
+            else:
+                results = [row for song in songs for row in flatten_song(song)]
+            return page_response(results, offset, limit, source='本地資料庫', fuzzy=True)
+
+        return page_response(results, offset, limit, source='本地資料庫')
+
+    except Exception as e:
+        logging.error(f"本地搜尋出錯: {str(e)}")
+        return jsonify({'error': '搜尋過程發生錯誤'}), 500
+
+@app.route('/api/hybrid-search', methods=['GET'])
+def hybrid_search():
+    """混合搜尋：立即回傳本地結果，並在背景向點歌王補齊新歌，寫回目錄並重建快照後即可查到"""
+    keyword = request.args.get('keyword', '')
+    if not keyword.strip():
+        return jsonify({'error': '請輸入搜尋關鍵字'}), 400
+
+    try:
+        limit, offset = parse_page_args(request.args)
+    except ValueError:
+        return jsonify({'error': '分頁參數格式錯誤'}), 400
+
+    try:
+        results = local_results(catalogs.current.song_index, keyword)
+        record_query(keyword, len(results), offset)
+        scheduled = backfiller.schedule(keyword)
+        return page_response(results, offset, limit, source='本地資料庫', backfill=scheduled)
+
+    except Exception as e:
+        logging.error(f"混合搜尋出錯: {str(e)}")
+        return jsonify({'error': '搜尋過程發生錯誤'}), 500
+
+@app.route('/api/suggest', methods=['GET'])
+def suggest():
+    """歌名與歌手的前綴自動完成"""
+    prefix = request.args.get('q', '')
+    if not prefix.strip():
+        return jsonify({'success': True, 'data': []})
+
+    try:
+        limit = int(request.args.get('limit', 10))
+    except ValueError:
+        return jsonify({'error': 'limit 參數格式錯誤'}), 400
+
+    return jsonify({
+        'success': True,
+        'data': catalogs.current.suggest_index.suggest(prefix, limit=limit)
+    })
+
+@app.route('/api/singer/<path:name>', methods=['GET'])
+def singer_lookup(name):
+    """歌手完整歌曲清單，編號資訊已依公司優先順序排序"""
+    snapshot = catalogs.current
+    entry = snapshot.singer_index.get(name)
+    if entry is None:
+        suggestions = [item['text'] for item in snapshot.suggest_index.suggest(name, limit=20)
+                       if item['type'] == 'singer'][:5]
+        return jsonify({'error': '找不到歌手', 'suggestions': suggestions}), 404
+
+    return jsonify({'success': True, 'data': entry})
+
+@app.route('/api/code', methods=['GET'])
+def code_lookup():
+    """點歌編號反查：code 完全相符，prefix 前綴，start/end 範圍 (prefix 與範圍需指定 company)"""
+    company = request.args.get('company', '').strip()
+    code = request.args.get('code', '').strip()
+    prefix = request.args.get('prefix', '').strip()
+    start = request.args.get('start', '').strip()
+    end = request.args.get('end', '').strip()
+    code_index = catalogs.current.code_index
+
+    if code:
+        return jsonify({'success': True, 'data': code_index.lookup(code, company or None)})
+
+    if not prefix and not start and not end:
+        return jsonify({'error': '請輸入 code、prefix 或 start/end 參數'}), 400
+    if not company:
+        return jsonify({'error': '前綴與範圍查詢需要指定 company'}), 400
+
+    try:
+        limit, offset = parse_page_args(request.args)
+    except ValueError:
+        return jsonify({'error': '分頁參數格式錯誤'}), 400
+
+    if prefix:
+        results = code_index.prefix(company, prefix)
+    else:
+        results = code_index.range(company, start, end)
+    return page_response(results, offset, limit, company=company)
+
+def format_upstream_song(song):
+    """source=upstream 的欄位格式 (保留點歌王的 youtubeID)"""
+    return {
+        '歌名': song.get('name', ''),
+        '歌手': song.get('singer', ''),
+        '編號': song.get('code', ''),
+        '公司': song.get('company', ''),
+        'youtubeID': song.get('youtubeID', '')
+    }
+
+def search_upstream(keyword):
+    """即時查詢點歌王 (不經回應快取)，使用共用連線池並設定逾時，斷路器的試探請求不會卡住"""
+    try:
+        limit, offset = parse_page_args(request.args)
+    except ValueError:
+        return jsonify({'error': '分頁參數格式錯誤'}), 400
+
     try:
-        results = scraper.search_song(keyword)
-        if results is None:
+        key = normalize_keyword(keyword)
+        try:
+            results = upstream_flight.do(
+                ('search_song', key),
+                lambda: guarded_upstream(lambda: upstream_client.search(keyword, timeout=15))
+            )
+        except (RateLimitExceeded, CircuitOpenError) as e:
+            # 上游額度用完或斷路器開啟時改用本地目錄回應，與本地搜尋相同的排序與分頁
+            results = local_results(catalogs.current.song_index, keyword)
+            return page_response(results, offset, limit, source='本地資料庫', **fallback_flags(e))
+        except (UpstreamError, requests.exceptions.RequestException) as e:
+            logging.error(f"即時查詢點歌王失敗: {str(e)}")
             return jsonify({'error': '搜尋失敗'}), 500
             
-        # 格式化結果
-        formatted_results = []
-        for song in results:
-            formatted_song = {
-                '歌名': song.get('name', ''),
-                '歌手': song.get('singer', ''),
-                '編號': song.get('code', ''),
-                '公司': song.get('company', ''),
-                'youtubeID': song.get('youtubeID', '')
-            }
-            formatted_results.append(formatted_song)
-            
-        return jsonify({
-            'success': True,
-            'data': formatted_results
-        })
+        if wants_grouped():
+            # 合併需要看過全部記錄，一次雜湊掃描轉換並分組
+            grouped = group_rows(format_taiwan_song(song) for song in results)
+            return page_response(grouped, offset, limit, source='台灣點歌王')
+
+        # 與本地搜尋相同的分頁與串流格式，只轉換本頁資料
+        return page_response(results, offset, limit, format_upstream_song, source='台灣點歌王')
         
     except Exception as e:
         logging.error(f"搜尋出錯: {str(e)}")
         return jsonify({'error': '搜尋過程發生錯誤'}), 500
 
+def cached_taiwan_ktv(keyword, timeout=15, company='全部'):
+    """經由快取查詢台灣點歌王，熱門關鍵字不必每次等待上游
+
+    正規化後的關鍵字只用於快取與請求合併的鍵，送給上游的仍是使用者輸入的原字
+    """
+    key = normalize_keyword(keyword)
+    cache_key = key if company == '全部' else (company, key)
+    return upstream_cache.get_or_fetch(
+        cache_key,
+        lambda: upstream_flight.do(
+            ('taiwan-ktv', company, key),
+            lambda: guarded_upstream(lambda: upstream_client.search(keyword, company=company, timeout=timeout))
+        )
+    )
+
 @app.route('/api/taiwan-ktv', methods=['GET'])
 def taiwan_ktv_search():
     """台灣點歌王搜尋代理API"""
@@ -58,62 +390,37 @@ def taiwan_ktv_search():
         return jsonify({'error': '請輸入搜尋關鍵字'}), 400
         
     try:
-        # 設定請求標頭，模擬正常瀏覽器請求
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'application/json, text/javascript, */*; q=0.01',
-            'Accept-Language': 'zh-TW,zh;q=0.9,en-US;q=0.8,en;q=0.7',
-            'Referer': 'https://song.corp.com.tw/',
-            'X-Requested-With': 'XMLHttpRequest',
-        }
-        
-        # 台灣點歌王API URL
-        taiwan_api_url = 'https://song.corp.com.tw/api/song.aspx'
-        params = {
-            'company': '全部',
-            'cusType': 'searchList',
-            'keyword': keyword
-        }
+        limit, offset = parse_page_args(request.args)
+    except ValueError:
+        return jsonify({'error': '分頁參數格式錯誤'}), 400
         
-        logging.info(f"正在搜尋台灣點歌王: {keyword}")
+    try:
+        data = cached_taiwan_ktv(keyword, timeout=10)
         
-        # 發送請求到台灣點歌王API
-        response = requests.get(taiwan_api_url, params=params, headers=headers, timeout=10)
+        logging.info(f"台灣點歌王搜尋成功: 找到 {len(data)} 首歌曲，回傳第 {offset + 1} 首起最多 {limit} 首")
         
-        if response.status_code == 200:
-            try:
-                data = response.json()
-                if isinstance(data, list):
-                    # 限制結果數量，避免過多資料
-                    limited_data = data[:50]
-                    
-                    logging.info(f"台灣點歌王搜尋成功: 找到 {len(data)} 首歌曲，回傳前 {len(limited_data)} 首")
-                    
-                    return jsonify({
-                        'success': True,
-                        'data': limited_data,
-                        'total': len(data)
-                    })
-                else:
-                    logging.warning(f"台灣點歌王回傳非陣列資料: {type(data)}")
-                    return jsonify({
-                        'success': False,
-                        'error': '搜尋結果格式錯誤'
-                    }), 500
-                    
-            except Exception as json_error:
-                logging.error(f"台灣點歌王回傳資料解析失敗: {str(json_error)}")
-                return jsonify({
-                    'success': False,
-                    'error': '搜尋結果解析失敗'
-                }), 500
-        else:
-            logging.error(f"台灣點歌王API請求失敗: HTTP {response.status_code}")
-            return jsonify({
-                'success': False,
-                'error': f'台灣點歌王API請求失敗: HTTP {response.status_code}'
-            }), 500
+        return page_response(data, offset, limit)
+
+    except CircuitOpenError as e:
+        # 上游暫停中：以本地目錄的排序結果回應，只轉換本頁的欄位為點歌王原始格式
+        results = catalogs.current.song_index.ranked_rows(keyword)
+        return page_response(results, offset, limit, transform=local_to_taiwan_song,
+                             source='本地資料庫', circuit_open=True)
+
+    except RateLimitExceeded as e:
+        response = jsonify({
+            'success': False,
+            'error': str(e)
+        })
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, 429
             
+    except UpstreamError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+        
     except requests.exceptions.Timeout:
         logging.error("台灣點歌王API請求超時")
         return jsonify({
@@ -135,56 +442,25 @@ def taiwan_ktv_search():
             'error': '搜尋過程發生未知錯誤'
         }), 500
 
-def search_taiwan_ktv(keyword):
-    """搜尋台灣點歌王的函數"""
-    try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'application/json, text/javascript, */*; q=0.01',
-            'Accept-Language': 'zh-TW,zh;q=0.9,en-US;q=0.8,en;q=0.7',
-            'Referer': 'https://song.corp.com.tw/',
-            'X-Requested-With': 'XMLHttpRequest',
-        }
-        
-        api_url = 'https://song.corp.com.tw/api/song.aspx'
-        params = {
-            'company': '全部',
-            'cusType': 'searchList',
-            'keyword': keyword
-        }
-        
-        logging.info(f"正在搜尋台灣點歌王: {keyword}")
-        
-        response = requests.get(api_url, params=params, headers=headers, timeout=15)
-        
-        if response.status_code == 200:
-            data = response.json()
-            
-            if isinstance(data, list):
-                # 轉換資料格式，與本地資料庫格式統一
-                results = []
-                for song in data:
-                    result = {
-                        '歌名': song.get('name', ''),
-                        '歌手': song.get('singer', ''),
-                        '編號': song.get('code', ''),
-                        '公司': song.get('company', ''),
-                        '語言': song.get('lang', ''),
-                    }
-                    results.append(result)
-                
-                logging.info(f"台灣點歌王搜尋成功: 找到 {len(results)} 首歌曲")
-                return results
-            else:
-                logging.warning(f"台灣點歌王回傳非陣列資料: {type(data)}")
-                return []
-        else:
-            logging.error(f"台灣點歌王API請求失敗: HTTP {response.status_code}")
-            return []
-            
-    except Exception as e:
-        logging.error(f"台灣點歌王搜尋錯誤: {str(e)}")
-        return []
+def format_taiwan_song(song):
+    """將點歌王原始欄位轉成本地資料庫格式"""
+    return {
+        '歌名': song.get('name', ''),
+        '歌手': song.get('singer', ''),
+        '編號': song.get('code', ''),
+        '公司': song.get('company', ''),
+        '語言': song.get('lang', ''),
+    }
+
+def local_to_taiwan_song(row):
+    """本地資料庫格式轉回點歌王原始欄位 (format_taiwan_song 的反向)"""
+    return {
+        'name': row.get('歌名', ''),
+        'singer': row.get('歌手', ''),
+        'code': row.get('編號', ''),
+        'company': row.get('公司', ''),
+        'lang': row.get('語言', ''),
+    }
 
 @app.route('/api/taiwan-search', methods=['GET'])
 def taiwan_search():
@@ -194,30 +470,246 @@ def taiwan_search():
         return jsonify({'error': '請輸入搜尋關鍵字'}), 400
     
     try:
-        results = search_taiwan_ktv(keyword)
-        
-        if results:
-            # 限制結果數量
-            limited_results = results[:50]
-            return jsonify({
-                'success': True,
-                'data': limited_results,
-                'total': len(results),
-                'source': '台灣點歌王'
-            })
+        limit, offset = parse_page_args(request.args)
+    except ValueError:
+        return jsonify({'error': '分頁參數格式錯誤'}), 400
+    
+    try:
+        try:
+            data = cached_taiwan_ktv(keyword)
+        except (RateLimitExceeded, CircuitOpenError) as e:
+            # 上游額度用完或斷路器開啟時改用本地目錄回應
+            results = local_results(catalogs.current.song_index, keyword)
+            return page_response(results, offset, limit, source='本地資料庫', **fallback_flags(e))
+        except Exception as e:
+            logging.error(f"台灣點歌王搜尋錯誤: {str(e)}")
+            record_query(keyword, None, offset)  # 上游錯誤不計為查無結果
+            data = []
         else:
-            return jsonify({
-                'success': True,
-                'data': [],
-                'total': 0,
-                'source': '台灣點歌王'
-            })
+            record_query(keyword, len(data), offset)
+
+        if wants_grouped():
+            # 合併需要看過全部記錄，一次雜湊掃描轉換並分組
+            results = group_rows(format_taiwan_song(song) for song in data)
+            return page_response(results, offset, limit, source='台灣點歌王')
+
+        # 只轉換本頁資料，不必每次處理整個結果集
+        return page_response(data, offset, limit, format_taiwan_song, source='台灣點歌王')
             
     except Exception as e:
         logging.error(f"台灣點歌王搜尋API錯誤: {str(e)}")
         return jsonify({'error': '搜尋過程發生錯誤'}), 500
 
+artifact_manifest = ArtifactManifest()
+
+def batch_result(index, keyword, source, rows, limit, **extra):
+    """批次搜尋中單一關鍵字的結果"""
+    RESULT_SIZE.observe(len(rows), route='/api/search/batch')  # 串流時已離開請求環境，直接指定路由
+    return {
+        'index': index,
+        'keyword': keyword,
+        'source': source,
+        'total': len(rows),
+        'data': rows[:limit],
+        **extra
+    }
+
+@app.route('/api/search/batch', methods=['POST'])
+def search_batch():
+    """批次搜尋：本地與快取命中立即回傳，其餘關鍵字並行查詢點歌王；stream=1 時依完成順序逐行輸出"""
+    body = request.get_json(silent=True) or {}
+    keywords = body.get('keywords')
+    if not isinstance(keywords, list) or not keywords:
+        return jsonify({'error': '請提供 keywords 陣列'}), 400
+    if len(keywords) > BATCH_MAX_KEYWORDS:
+        return jsonify({'error': f'一次最多 {BATCH_MAX_KEYWORDS} 個關鍵字'}), 400
+
+    try:
+        limit = parse_limit(body.get('limit'), default=10)
+    except ValueError:
+        return jsonify({'error': 'limit 參數格式錯誤'}), 400
+    use_upstream = body.get('upstream', True) is not False
+
+    snapshot = catalogs.current
+    ready = []
+    pending = {}  # 正規化關鍵字 -> [(位置, 原始關鍵字)]，重複的關鍵字只查一次
+    for index, keyword in enumerate(keywords):
+        keyword = str(keyword).strip()
+        if not keyword:
+            ready.append(batch_result(index, keyword, None, [], limit))
+            continue
+
+        rows = snapshot.song_index.ranked_rows(keyword)
+        record_query(keyword, len(rows))
+        if rows or not use_upstream:
+            ready.append(batch_result(index, keyword, '本地資料庫', rows, limit))
+            continue
+
+        key = normalize_keyword(keyword)
+        cached = upstream_cache.peek(key)
+        if cached is not None:
+            rows = [format_taiwan_song(song) for song in cached]
+            ready.append(batch_result(index, keyword, '台灣點歌王', rows, limit))
+            continue
+        pending.setdefault(key, []).append((index, keyword))
+
+    # 重複的關鍵字以第一次出現的原字查詢上游
+    futures = {batch_executor.submit(cached_taiwan_ktv, entries[0][1], 10): key for key, entries in pending.items()}
+
+    def iter_results():
+        yield from ready
+        for future in as_completed(futures):
+            key = futures[future]
+            try:
+                rows = [format_taiwan_song(song) for song in future.result()]
+                error = None
+            except (RateLimitExceeded, CircuitOpenError) as e:
+                rows = []
+                error = str(e)
+            except Exception as e:
+                logging.warning(f"批次搜尋上游查詢失敗 {key}: {str(e)}")
+                rows = []
+                error = '無法連接到台灣點歌王服務'
+            for index, keyword in pending[key]:
+                if error:
+                    yield batch_result(index, keyword, '台灣點歌王', rows, limit, error=error)
+                else:
+                    yield batch_result(index, keyword, '台灣點歌王', rows, limit)
+
+    if request.args.get('stream') == '1':
+        return Response(iter_ndjson(iter_results()), mimetype='application/x-ndjson',
+                        headers={'X-Total-Count': str(len(keywords))})
+
+    results = sorted(iter_results(), key=lambda result: result['index'])
+    return jsonify({
+        'success': True,
+        'data': results,
+        'total': len(results),
+        'upstream_queries': len(pending)
+    })
+
+LIVE_SEARCH_TIMEOUT = int(os.environ.get('LIVE_SEARCH_TIMEOUT', 30))  # 整個串流最多等待上游的秒數
+
+@app.route('/api/search/live', methods=['GET'])
+def search_live():
+    """即時搜尋 (SSE)：第一個事件立即送出本地結果，之後每家公司的點歌王結果一查到就送出"""
+    keyword = request.args.get('keyword', '')
+    if not keyword.strip():
+        return jsonify({'error': '請輸入搜尋關鍵字'}), 400
+
+    try:
+        limit = parse_limit(request.args.get('limit'))
+    except ValueError:
+        return jsonify({'error': 'limit 參數格式錯誤'}), 400
+
+    # 只接受已知的公司並去除重複，單一請求最多送出 len(PRIORITY_COMPANIES) 個上游查詢
+    companies = list(dict.fromkeys(
+        company.strip() for company in request.args.get('companies', '').split(',') if company.strip()))
+    unknown = [company for company in companies if company not in PRIORITY_COMPANIES]
+    if unknown:
+        return jsonify({'error': f"不支援的公司: {', '.join(unknown[:5])}",
+                        'companies': PRIORITY_COMPANIES}), 400
+    companies = companies or PRIORITY_COMPANIES
+    grouped = wants_grouped()
+
+    start = time.time()
+    local = local_results(catalogs.current.song_index, keyword)
+    record_query(keyword, len(local))
+
+    # 生成器開始前就送出上游查詢，與本地結果的傳送同時進行
+    futures = {batch_executor.submit(cached_taiwan_ktv, keyword, 10, company): company for company in companies}
+
+    def format_rows(data):
+        rows = [format_taiwan_song(song) for song in data]
+        return group_rows(rows) if grouped else rows
+
+    def iter_events():
+        yield sse_event('local', {
+            'source': '本地資料庫',
+            'total': len(local),
+            'data': local[:limit],
+            'elapsed_ms': round((time.time() - start) * 1000)
+        })
+
+        completed = 0
+        try:
+            for future in as_completed(futures, timeout=LIVE_SEARCH_TIMEOUT):
+                company = futures[future]
+                completed += 1
+                event = {'source': '台灣點歌王', 'company': company}
+                try:
+                    rows = format_rows(future.result())
+                    event.update({'total': len(rows), 'data': rows[:limit]})
+                except (RateLimitExceeded, CircuitOpenError) as e:
+                    event.update({'total': 0, 'data': [], 'error': str(e), **fallback_flags(e)})
+                except Exception as e:
+                    logging.warning(f"即時搜尋上游查詢失敗 {keyword} ({company}): {str(e)}")
+                    event.update({'total': 0, 'data': [], 'error': '無法連接到台灣點歌王服務'})
+                event['elapsed_ms'] = round((time.time() - start) * 1000)
+                yield sse_event('company', event)
+        except FuturesTimeoutError:
+            logging.warning(f"即時搜尋逾時 {keyword}: {completed}/{len(futures)} 家公司完成")
+
+        yield sse_event('done', {
+            'companies': len(futures),
+            'completed': completed,
+            'timed_out': [company for future, company in futures.items() if not future.done()],
+            'elapsed_ms': round((time.time() - start) * 1000)
+        })
+
+    # 關閉代理伺服器的緩衝，事件才會立即送達瀏覽器
+    return Response(iter_events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/<any(songs_simplified.json, singers_data.json, unified_karaoke_db.json):filename>', methods=['GET'])
+def catalog_artifact(filename):
+    """提供目錄 JSON：優先送出預先壓縮的 br/gzip 版本，ETag 相同時回 304"""
+    path = os.path.abspath(os.path.join(PUBLIC_DIR, filename))
+    if not os.path.exists(path):
+        return jsonify({'error': '找不到檔案'}), 404
+
+    entry = artifact_manifest.get(filename)
+    if entry is None:
+        # 尚未執行 artifacts.py，直接送出原始檔案
+        return send_file(path, mimetype='application/json')
+
+    etag = entry['etag']
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        encoding = None
+        for candidate in ('br', 'gzip'):
+            if candidate in entry['encodings'] and request.accept_encodings[candidate]:
+                encoding = candidate
+                break
+
+        suffix = ENCODING_SUFFIXES.get(encoding, '')
+        response = send_file(f"{path}{suffix}", mimetype='application/json', download_name=filename,
+                             etag=False, conditional=False)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+
+    response.set_etag(etag)
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = 'public, max-age=0, must-revalidate'
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus 指標"""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    """上游快取命中與請求合併統計"""
+    stats = upstream_cache.get_stats()
+    stats['single_flight'] = upstream_flight.get_stats()
+    stats['backfill'] = backfiller.get_stats()
+    stats['catalog'] = catalogs.get_stats()
+    stats['rate_limit'] = upstream_limiter.get_stats()
+    stats['circuit_breaker'] = upstream_breaker.get_stats()
+    return jsonify(stats)
+
 if __name__ == '__main__':
-    import os
     port = int(os.environ.get('PORT', 5000))
     app.run(debug=False, host='0.0.0.0', port=port) 
\ No newline at end of file
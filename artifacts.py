@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+目錄檔案發佈工具 - 產生壓縮過的 JSON 與預先壓縮的 gzip/brotli 版本，並以內容雜湊作為 ETag
+使用方法: python3 artifacts.py
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+
+try:
+    import brotli
+except ImportError:  # brotli 為選用套件，沒有安裝時只產生 gzip
+    brotli = None
+
+PUBLIC_DIR = 'public'
+MANIFEST_NAME = 'artifacts_manifest.json'
+ARTIFACT_NAMES = ['songs_simplified.json', 'singers_data.json', 'unified_karaoke_db.json']
+ENCODING_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+
+def _atomic_write(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def build_artifact(name, public_dir=PUBLIC_DIR):
+    """將單一 JSON 檔改寫成無縮排格式，並產生 .gz / .br，回傳 manifest 項目"""
+    path = os.path.join(public_dir, name)
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    raw = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    _atomic_write(path, raw)
+
+    entry = {
+        'etag': hashlib.sha256(raw).hexdigest()[:32],
+        'size': len(raw),
+        'encodings': {}
+    }
+
+    compressed = gzip.compress(raw, compresslevel=9, mtime=0)
+    _atomic_write(f"{path}.gz", compressed)
+    entry['encodings']['gzip'] = len(compressed)
+
+    if brotli is not None:
+        compressed = brotli.compress(raw, quality=11)
+        _atomic_write(f"{path}.br", compressed)
+        entry['encodings']['br'] = len(compressed)
+    elif os.path.exists(f"{path}.br"):
+        # 舊的 .br 已與內容不符，避免送出過期資料
+        os.remove(f"{path}.br")
+
+    return entry
+
+
+def build_all(public_dir=PUBLIC_DIR, names=None):
+    """建立目錄檔案並寫入 manifest；指定 names 時只重建這些檔案，其餘項目沿用現有 manifest"""
+    manifest_path = os.path.join(public_dir, MANIFEST_NAME)
+    manifest = {}
+    if names is not None:
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            names = None  # 沒有可沿用的 manifest 時全部重建
+
+    for name in ARTIFACT_NAMES:
+        if not os.path.exists(os.path.join(public_dir, name)):
+            manifest.pop(name, None)
+            continue
+        if names is not None and name not in names:
+            continue
+        try:
+            manifest[name] = build_artifact(name, public_dir)
+            entry = manifest[name]
+            sizes = ', '.join(f"{encoding} {size:,}" for encoding, size in entry['encodings'].items())
+            logging.info(f"已產生 {name}: {entry['size']:,} bytes ({sizes})")
+        except Exception as e:
+            # 保留舊項目會讓 ETag 與內容不符，移除後 API 改送原始檔案
+            manifest.pop(name, None)
+            logging.error(f"產生 {name} 失敗: {str(e)}")
+
+    _atomic_write(
+        manifest_path,
+        json.dumps(manifest, ensure_ascii=False, indent=2).encode('utf-8')
+    )
+    return manifest
+
+
+def file_etag(path):
+    """以目前檔案內容計算與 build_artifact 相同的 ETag"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:32]
+
+
+def _stat_key(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+class ArtifactManifest:
+    """讀取 manifest，檔案更新時自動重新載入；送出前確認項目與目前的 JSON 及壓縮檔相符"""
+
+    def __init__(self, public_dir=PUBLIC_DIR):
+        self.public_dir = public_dir
+        self.path = os.path.join(public_dir, MANIFEST_NAME)
+        self.mtime = None
+        self.entries = {}
+        self.verified = {}  # name -> (檔案狀態, 驗證後的項目)，檔案沒變就不必重新計算雜湊
+        self.lock = threading.Lock()
+
+    def _load(self):
+        """呼叫時須持有 lock，manifest 不存在或無法讀取時回傳 False"""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return False
+
+        if mtime != self.mtime:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+                self.mtime = mtime
+            except Exception as e:
+                logging.warning(f"讀取 {self.path} 失敗: {str(e)}")
+                return False
+        return True
+
+    def get(self, name):
+        """回傳 {etag, size, encodings}；沒有 manifest 時回傳 None
+
+        爬蟲或背景補齊改寫 JSON 後 manifest 可能尚未重建，此時以目前內容重新計算 ETag，
+        並只保留大小仍與 manifest 相符的壓縮檔 (內容已變時一律不提供壓縮版本)
+        """
+        path = os.path.join(self.public_dir, name)
+        with self.lock:
+            if not self._load():
+                return None
+            entry = self.entries.get(name)
+            state = (self.mtime, _stat_key(path), _stat_key(f"{path}.gz"), _stat_key(f"{path}.br"))
+            cached = self.verified.get(name)
+            if cached is not None and cached[0] == state:
+                return cached[1]
+            if state[1] is None:
+                return None
+
+            etag = file_etag(path)
+            if entry is not None and entry['etag'] == etag:
+                encodings = {}
+                for encoding, size in entry['encodings'].items():
+                    stat = _stat_key(f"{path}{ENCODING_SUFFIXES[encoding]}")
+                    if stat is not None and stat[1] == size:
+                        encodings[encoding] = size
+                verified = {**entry, 'encodings': encodings}
+            else:
+                logging.warning(f"{name} 與 {MANIFEST_NAME} 不符，改送原始檔案 (請重新執行 artifacts.py)")
+                verified = {'etag': etag, 'size': state[1][1], 'encodings': {}}
+            self.verified[name] = (state, verified)
+            return verified
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    result = build_all()
+    missing = [name for name in ARTIFACT_NAMES
+               if os.path.exists(os.path.join(PUBLIC_DIR, name)) and name not in result]
+    print(f"✅ 已產生 {len(result)} 個目錄檔案")
+    if missing:
+        print(f"❌ 產生失敗: {', '.join(missing)}")
+        sys.exit(1)
@@ -65,9 +65,30 @@ main() {
         if [[ $ADDED_COUNT -gt 0 ]]; then
             log_success "新增了 $ADDED_COUNT 首歌曲！總計: $NEW_COUNT 首"
             
+            # 產生壓縮版本與 ETag
+            log_info "📦 產生預先壓縮的目錄檔案..."
+            ARTIFACTS_OK=1
+            python3 artifacts.py || { ARTIFACTS_OK=0; log_warning "產生壓縮檔案失敗，僅提交原始檔案"; }
+            
+            # 預先建立搜尋索引快照，API 重新啟動時不必重建索引
+            python3 catalog_watcher.py || log_warning "產生索引快照失敗，API 啟動時會重新建立"
+            
             # 自動提交到 Git
             log_info "📤 自動提交更新到 GitHub..."
             git add public/songs_simplified.json
+            if [[ $ARTIFACTS_OK -eq 1 ]]; then
+                for artifact in public/songs_simplified.json.gz public/artifacts_manifest.json; do
+                    if [[ -f "$artifact" ]]; then
+                        git add "$artifact"
+                    else
+                        log_warning "找不到 $artifact，本次提交不包含此檔案"
+                    fi
+                done
+                # brotli 為選用套件，有產生才提交
+                if [[ -f public/songs_simplified.json.br ]]; then
+                    git add public/songs_simplified.json.br
+                fi
+            fi
             
             COMMIT_MESSAGE="自動更新歌曲資料庫: +$ADDED_COUNT 首歌曲 (總計: $NEW_COUNT 首)
 
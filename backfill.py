@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""
+背景補齊 (方案B) - 本地目錄先回應，再於背景查詢點歌王並把新歌寫回目錄檔
+快照建立後不再修改：新記錄先排入佇列，寫回目前快照的來源檔後由目錄監看重建新快照
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from artifacts import build_all
+from catalog import CATALOG_PATHS, save_catalog, write_json
+from response_cache import normalize_keyword
+from working_scraper import merge_song_into_db, song_key_for
+
+DEFAULT_SAVE_PATH = CATALOG_PATHS[-1]  # 還沒有任何目錄檔時寫入 songs_simplified.json
+
+
+def upstream_to_song_data(song):
+    """點歌王原始欄位 -> add_song_to_database 使用的格式"""
+    return {
+        '歌名': str(song.get('name', '')).strip(),
+        '歌手': str(song.get('singer', '')).strip(),
+        '編號': str(song.get('code', '')).strip(),
+        '公司': str(song.get('company', '')).strip(),
+        '語言': str(song.get('lang', '')).strip()
+    }
+
+
+def row_key(song_data):
+    return (song_data['歌名'], song_data['歌手'], song_data['公司'], song_data['編號'])
+
+
+def write_back(path, rows):
+    """依檔案既有格式 (統一資料庫或逐筆記錄) 合併新記錄並寫回，回傳實際新增的記錄數"""
+    data = []
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+    added = 0
+    if isinstance(data, dict) and 'songs' in data:
+        for song_data in rows:
+            if merge_song_into_db(data, song_data):
+                added += 1
+        if added:
+            save_catalog(data, path)
+    elif isinstance(data, list):
+        existing = {(row.get('歌名', ''), row.get('歌手', ''), row.get('公司', ''), row.get('編號', ''))
+                    for row in data}
+        for song_data in rows:
+            if row_key(song_data) not in existing:
+                existing.add(row_key(song_data))
+                data.append(song_data)
+                added += 1
+        if added:
+            write_json(data, path)
+    else:
+        raise ValueError(f'無法識別的目錄格式: {path}')
+    return added
+
+
+class Backfiller:
+    def __init__(self, fetch, on_saved=None, enabled=True, cooldown=3600, save_delay=60, max_workers=2):
+        self.fetch = fetch  # fetch(keyword) -> 點歌王原始歌曲陣列
+        self.on_saved = on_saved  # on_saved(path) 在寫回目錄檔後呼叫 (例如要求目錄監看立即重建)
+        self.enabled = enabled
+        self.cooldown = cooldown  # 同一關鍵字多久內不重複補齊 (秒)
+        self.save_delay = save_delay  # 合併後延遲寫檔，多次補齊只寫一次 (秒)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='backfill')
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()  # 同一時間只有一個寫檔
+        self.snapshot = None
+        self.pending = {}  # (歌名, 歌手, 公司, 編號) -> 尚未寫回的記錄
+        self.recent = {}  # 正規化關鍵字 -> 上次補齊時間
+        self.save_timer = None
+        self.stats = {'scheduled': 0, 'skipped': 0, 'failed': 0, 'queued': 0, 'written': 0, 'save_errors': 0}
+
+    def rebind(self, snapshot):
+        """目錄快照替換後，以新快照判斷哪些記錄已存在"""
+        with self.lock:
+            self.snapshot = snapshot
+
+    def schedule(self, keyword):
+        """排入背景補齊；停用或冷卻時間內已補齊過的關鍵字回傳 False
+
+        冷卻以正規化後的關鍵字判斷，向上游查詢時仍使用原字
+        """
+        if not self.enabled:
+            return False
+        key = normalize_keyword(keyword)
+        now = time.time()
+        with self.lock:
+            last = self.recent.get(key)
+            if last is not None and now - last < self.cooldown:
+                self.stats['skipped'] += 1
+                return False
+            if len(self.recent) > 10000:
+                self.recent = {k: t for k, t in self.recent.items() if now - t < self.cooldown}
+            self.recent[key] = now
+            self.stats['scheduled'] += 1
+        self.executor.submit(self._run, keyword, key)
+        return True
+
+    def _run(self, keyword, key):
+        try:
+            data = self.fetch(keyword)
+        except Exception as e:
+            logging.warning(f"背景補齊失敗 {keyword}: {str(e)}")
+            with self.lock:
+                self.stats['failed'] += 1
+                # 失敗的關鍵字允許下次查詢再試
+                self.recent.pop(key, None)
+            return
+
+        queued = self.merge(data)
+        if queued:
+            logging.info(f"背景補齊 {keyword}: {queued} 筆新記錄等待寫回")
+
+    def _is_known(self, song_data):
+        """目前快照已有此歌曲編號時回傳 True (只讀取快照，不修改)"""
+        if self.snapshot is None:
+            return False
+        song = self.snapshot.catalog['songs'].get(song_key_for(song_data))
+        if song is None:
+            return False
+        return any(code_info['公司'] == song_data['公司'] and code_info['編號'] == song_data['編號']
+                   for code_info in song.get('編號資訊', []))
+
+    def merge(self, data):
+        """把快照中沒有的記錄排入寫回佇列，回傳新排入的筆數"""
+        queued = 0
+        with self.lock:
+            for song in data:
+                song_data = upstream_to_song_data(song)
+                if not song_data['歌名'] or not song_data['編號']:
+                    continue
+                key = row_key(song_data)
+                if key in self.pending or self._is_known(song_data):
+                    continue
+                self.pending[key] = song_data
+                queued += 1
+
+            self.stats['queued'] += queued
+            if queued:
+                self._schedule_save()
+        return queued
+
+    def _schedule_save(self):
+        """延遲寫檔，呼叫時須持有 lock"""
+        if self.save_timer is not None:
+            return
+        self.save_timer = threading.Timer(self.save_delay, self.flush)
+        self.save_timer.daemon = True
+        self.save_timer.start()
+
+    def flush(self):
+        """將佇列中的記錄寫回目前快照的來源檔，再通知重建快照"""
+        with self.save_lock:
+            with self.lock:
+                self.save_timer = None
+                rows = list(self.pending.values())
+                self.pending = {}
+                snapshot = self.snapshot
+            if not rows:
+                return
+
+            # 寫回快照實際讀取的檔案，避免另外產生優先權更高的目錄檔而遮蔽爬蟲的更新
+            path = snapshot.source if snapshot is not None and snapshot.source else DEFAULT_SAVE_PATH
+            try:
+                written = write_back(path, rows)
+            except Exception as e:
+                logging.error(f"背景補齊寫檔失敗 {path}: {str(e)}")
+                with self.lock:
+                    self.stats['save_errors'] += 1
+                    for song_data in rows:
+                        self.pending.setdefault(row_key(song_data), song_data)
+                    # 重新排入的記錄稍後再寫，不必等下一次補齊才觸發
+                    self._schedule_save()
+                return
+
+            with self.lock:
+                self.stats['written'] += written
+            logging.info(f"背景補齊結果已寫入 {path}: {written} 筆")
+            if written:
+                # 重建壓縮檔與 manifest，前端下載的目錄才會包含補齊的歌曲
+                try:
+                    build_all(os.path.dirname(path), [os.path.basename(path)])
+                except Exception as e:
+                    # 目錄檔已寫入，重建失敗仍要通知重新載入快照
+                    logging.error(f"背景補齊重建壓縮檔失敗 {path}: {str(e)}")
+
+        if written and self.on_saved is not None:
+            self.on_saved(path)
+
+    def get_stats(self):
+        """回傳補齊統計"""
+        with self.lock:
+            stats = dict(self.stats)
+            stats['pending'] = len(self.pending)
+        return stats
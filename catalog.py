@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""
+歌曲目錄載入工具 - 將爬蟲產出的 JSON 檔案統一轉成資料庫格式
+"""
+
+import json
+import logging
+import os
+from datetime import datetime
+
+from text_normalize import dedup_key
+
+# 依序嘗試的目錄檔案 (統一資料庫優先)
+CATALOG_PATHS = [
+    'public/unified_karaoke_db.json',
+    'public/songs_simplified.json',
+]
+
+SINGERS_DATA_PATH = 'public/singers_data.json'
+
+# 編號資訊的公司排序 (錢櫃、好樂迪、銀櫃優先)
+PRIORITY_COMPANIES = ['錢櫃', '好樂迪', '銀櫃', '音圓', '金嗓', '弘音', '星據點', '音霸', '大東', '點將家']
+COMPANY_RANK = {company: rank for rank, company in enumerate(PRIORITY_COMPANIES)}
+
+
+def code_info_sort_key(code_info):
+    """依公司優先順序、公司名稱、編號排序"""
+    return (
+        COMPANY_RANK.get(code_info['公司'], 999),
+        code_info['公司'],
+        code_info['編號']
+    )
+
+
+def sort_code_info(codes):
+    """就地排序一首歌的編號資訊並回傳"""
+    codes.sort(key=code_info_sort_key)
+    return codes
+
+
+def empty_catalog():
+    """建立空的統一資料庫結構"""
+    return {
+        'metadata': {
+            'total_songs': 0,
+            'total_singers': 0,
+            'singers': [],
+            'companies': []
+        },
+        'songs': {}
+    }
+
+
+def catalog_from_rows(rows):
+    """將 songs_simplified.json 的逐筆編號記錄合併成統一資料庫格式"""
+    catalog = empty_catalog()
+    songs = catalog['songs']
+    groups = {}  # 正規化後的歌名+歌手 -> 第一次出現的歌曲鍵，台/臺等寫法視為同一首
+    singers = {}
+    companies = {}
+
+    for row in rows:
+        name = str(row.get('歌名', '')).strip()
+        singer = str(row.get('歌手', '')).strip()
+        if not name:
+            continue
+
+        group = dedup_key(name, singer)
+        song_key = groups.get(group)
+        if song_key is None:
+            song_key = f"{name}_{singer}"
+            groups[group] = song_key
+            songs[song_key] = {
+                '歌名': name,
+                '歌手': singer,
+                '語言': row.get('語言', ''),
+                '編號資訊': []
+            }
+            singers.setdefault(singer, True)
+
+        company = row.get('公司', '')
+        code = row.get('編號', '')
+        if company or code:
+            songs[song_key]['編號資訊'].append({'公司': company, '編號': code})
+            companies.setdefault(company, True)
+
+    catalog['metadata']['total_songs'] = len(songs)
+    catalog['metadata']['singers'] = list(singers)
+    catalog['metadata']['total_singers'] = len(singers)
+    catalog['metadata']['companies'] = list(companies)
+    return catalog
+
+
+def load_catalog(path=None):
+    """載入歌曲目錄，回傳 (統一資料庫, 來源檔案)；找不到檔案時回傳空目錄"""
+    paths = [path] if path else CATALOG_PATHS
+
+    for candidate in paths:
+        if not os.path.exists(candidate):
+            continue
+
+        try:
+            with open(candidate, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            logging.error(f"載入歌曲目錄失敗 {candidate}: {str(e)}")
+            continue
+
+        if isinstance(data, dict) and 'songs' in data:
+            return data, candidate
+        if isinstance(data, list):
+            return catalog_from_rows(data), candidate
+
+        logging.warning(f"無法識別的目錄格式: {candidate}")
+
+    logging.warning("找不到歌曲目錄檔案，本地搜尋將沒有資料")
+    return empty_catalog(), None
+
+
+def flatten_song(song):
+    """將一首歌展開成前端相容的逐筆編號記錄"""
+    rows = []
+    for code_info in song.get('編號資訊', []):
+        rows.append({
+            '歌名': song.get('歌名', ''),
+            '歌手': song.get('歌手', ''),
+            '編號': code_info.get('編號', ''),
+            '公司': code_info.get('公司', ''),
+            '語言': song.get('語言', '')
+        })
+    return rows
+
+
+def song_record(song):
+    """輸出統一資料庫格式的一首歌，編號資訊依公司優先順序排序 (不修改目錄本身)"""
+    return {
+        '歌名': song.get('歌名', ''),
+        '歌手': song.get('歌手', ''),
+        '語言': song.get('語言', ''),
+        '編號資訊': sort_code_info([
+            {'公司': code_info.get('公司', ''), '編號': code_info.get('編號', '')}
+            for code_info in song.get('編號資訊', [])
+        ])
+    }
+
+
+def group_rows(rows):
+    """將逐筆編號記錄依歌名+歌手合併成編號資訊格式 (單次雜湊掃描，保留第一次出現的順序)"""
+    songs = {}
+    seen_codes = set()
+    for row in rows:
+        name = row.get('歌名', '')
+        singer = row.get('歌手', '')
+        key = dedup_key(name, singer)
+        song = songs.get(key)
+        if song is None:
+            song = songs[key] = {'歌名': name, '歌手': singer, '語言': row.get('語言', ''), '編號資訊': []}
+
+        code = (row.get('公司', ''), row.get('編號', ''))
+        if (key, code) in seen_codes:
+            continue
+        seen_codes.add((key, code))
+        song['編號資訊'].append({'公司': code[0], '編號': code[1]})
+
+    grouped = list(songs.values())
+    for song in grouped:
+        sort_code_info(song['編號資訊'])
+    return grouped
+
+
+def write_json(data, path):
+    """以無縮排格式寫入 JSON (先寫暫存檔再替換，讀取端不會看到寫到一半的檔案)"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+
+def save_catalog(catalog, path):
+    """寫入統一資料庫"""
+    catalog['metadata']['最後更新時間'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    write_json(catalog, path)
+
+
+def load_singers_data(path=SINGERS_DATA_PATH):
+    """載入 singers_data.json，找不到或格式錯誤時回傳 None"""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except Exception as e:
+        logging.error(f"載入歌手資料失敗 {path}: {str(e)}")
+        return None
+    return data if isinstance(data, dict) else None
@@ -0,0 +1,319 @@
+# -*- coding: utf-8 -*-
+"""
+目錄熱更新 - 偵測 public/*.json 變更，在背景重建所有索引後一次替換快照
+索引會另存成預先建好的快照檔，下次啟動時內容雜湊相同就直接載入，不必重新建立
+使用方法: python3 catalog_watcher.py  (部署前先產生快照)
+"""
+
+import gc
+import hashlib
+import logging
+import os
+import pickle
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from catalog import CATALOG_PATHS, SINGERS_DATA_PATH, empty_catalog, load_catalog
+from code_index import CodeIndex
+from fuzzy_index import FuzzyIndex
+from search_index import SongIndex
+from singer_index import SingerIndex
+from suggest_index import SuggestIndex
+
+WATCH_PATHS = CATALOG_PATHS + [SINGERS_DATA_PATH]
+SNAPSHOT_PATH = 'data/catalog_snapshot.pickle'
+SNAPSHOT_FORMAT = 2  # 索引類別結構改變時遞增，舊快照自動作廢
+
+
+def file_signature(paths):
+    """以 (路徑, mtime, 大小) 判斷檔案是否可能變更，成本很低"""
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        signature.append((path, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def content_digest(paths):
+    """檔案內容的 sha256，只在 mtime 變更時計算，避免 touch 造成無謂的重建"""
+    digest = hashlib.sha256()
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        digest.update(path.encode('utf-8'))
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+@contextmanager
+def gc_paused():
+    """建立或載入大量小物件時暫停循環垃圾回收，索引載入約可快一倍"""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+class CatalogSnapshot:
+    """一個目錄版本與其所有索引；建立後不再替換內部物件"""
+
+    def __init__(self, catalog, source, version, indexes=None):
+        self.catalog = catalog
+        self.source = source
+        self.version = version
+        self.loaded_at = time.time()
+        if indexes is None:
+            indexes = {
+                'song_index': SongIndex.from_catalog(catalog),
+                'suggest_index': SuggestIndex.from_catalog(catalog),
+                'singer_index': SingerIndex.load(catalog),
+                'code_index': CodeIndex.from_catalog(catalog),
+            }
+        self.song_index = indexes['song_index']
+        self.suggest_index = indexes['suggest_index']
+        self.singer_index = indexes['singer_index']
+        self.code_index = indexes['code_index']
+
+        # 錯字容忍索引建立最久且只有 fuzzy=1 會用到，延後到背景建立
+        self._fuzzy_index = None
+        self._fuzzy_lock = threading.Lock()
+
+    @property
+    def fuzzy_index(self):
+        with self._fuzzy_lock:
+            if self._fuzzy_index is None:
+                self._fuzzy_index = FuzzyIndex(self.song_index)
+            return self._fuzzy_index
+
+    def warm_up(self):
+        """在背景建立延後的索引"""
+        threading.Thread(target=lambda: self.fuzzy_index, name='fuzzy-index', daemon=True).start()
+
+    @classmethod
+    def load(cls, version=None):
+        with gc_paused():
+            catalog, source = load_catalog()
+            return cls(catalog, source, version)
+
+    def save(self, path=SNAPSHOT_PATH):
+        """寫入快照檔 (歌曲物件在目錄與索引間共用，pickle 會保留同一個參照)"""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        data = {
+            'format': SNAPSHOT_FORMAT,
+            'version': self.version,
+            'source': self.source,
+            'catalog': self.catalog,
+            'indexes': {
+                'song_index': self.song_index,
+                'suggest_index': self.suggest_index,
+                'singer_index': self.singer_index,
+                'code_index': self.code_index,
+            }
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load_prebuilt(cls, version, path=SNAPSHOT_PATH):
+        """載入版本相符的快照檔，沒有或已過期時回傳 None (快照檔只由本程式產生)"""
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            with gc_paused(), open(path, 'rb') as f:
+                data = pickle.load(f)
+        except Exception as e:
+            logging.warning(f"讀取索引快照失敗 {path}: {str(e)}")
+            return None
+        if data.get('format') != SNAPSHOT_FORMAT or data.get('version') != version:
+            logging.info(f"索引快照已過期，改為重新建立: {path}")
+            return None
+        return cls(data['catalog'], data['source'], version, data['indexes'])
+
+
+class CatalogWatcher:
+    def __init__(self, paths=None, interval=10, on_swap=None, snapshot_path=SNAPSHOT_PATH,
+                 save_snapshots=False, startup_timeout=60):
+        """interval 秒檢查一次；on_swap(snapshot) 在每次快照生效後呼叫 (包含第一次載入)
+
+        啟動時只讀取預先建好的快照檔；save_snapshots 為 True 時才在重建後寫回 (預設由
+        python3 catalog_watcher.py 在部署前產生，匯入 app 不會建立 data/ 或寫入檔案)
+        """
+        self.paths = paths or WATCH_PATHS
+        self.interval = interval
+        self.on_swap = on_swap
+        self.snapshot_path = snapshot_path  # None 時不讀寫快照檔
+        self.save_snapshots = save_snapshots
+        self.startup_timeout = startup_timeout
+        self.signature = None
+        self.pending = None  # 最近看到、尚未穩定的簽章
+        self.digest = None
+        self.stats = {'checks': 0, 'reloads': 0, 'skipped': 0, 'failed': 0, 'startup_ms': None,
+                      'from_snapshot': False}
+        self.lock = threading.Lock()  # 避免手動 reload 與背景檢查同時重建
+
+        # 請求只讀取 current 一次，替換參照是原子操作，不會看到建到一半的索引
+        self._current = None
+        self.ready = threading.Event()
+
+        # 第一次載入也在背景進行，匯入 app 不必等待索引
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='catalog-watcher', daemon=True)
+        self.thread.start()
+
+    @property
+    def current(self):
+        """目前的目錄快照；啟動中時等待第一次載入完成"""
+        snapshot = self._current
+        if snapshot is None:
+            self.ready.wait(self.startup_timeout)
+            snapshot = self._current
+            if snapshot is None:
+                raise RuntimeError('歌曲目錄尚未載入完成')
+        return snapshot
+
+    def _run(self):
+        try:
+            self._initial_load()
+        except Exception as e:
+            logging.error(f"載入歌曲目錄失敗: {str(e)}")
+            self._current = CatalogSnapshot(empty_catalog(), None, None)
+            self.ready.set()
+
+        if not self.interval:
+            return
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                logging.error(f"目錄熱更新失敗: {str(e)}")
+                self.stats['failed'] += 1
+
+    def _initial_load(self):
+        start = time.time()
+        with self.lock:
+            self.signature = file_signature(self.paths)
+            self.digest = content_digest(self.paths)
+            version = self.digest[:12]
+
+            snapshot = CatalogSnapshot.load_prebuilt(version, self.snapshot_path)
+            self.stats['from_snapshot'] = snapshot is not None
+            if snapshot is None:
+                snapshot = CatalogSnapshot.load(version)
+
+            self._swap(snapshot)
+            self.ready.set()
+
+        self.stats['startup_ms'] = round((time.time() - start) * 1000)
+        logging.info(f"本地歌曲目錄來源: {snapshot.source} (版本 {snapshot.version}, "
+                     f"{'快照' if self.stats['from_snapshot'] else '重新建立'}, "
+                     f"耗時 {self.stats['startup_ms']} ms)")
+        if not self.stats['from_snapshot']:
+            self._save(snapshot)
+
+    def _swap(self, snapshot):
+        self._current = snapshot
+        snapshot.warm_up()
+        if self.on_swap is not None:
+            self.on_swap(snapshot)
+
+    def _save(self, snapshot):
+        if not self.snapshot_path or not self.save_snapshots:
+            return
+        if not snapshot.song_index.songs:
+            # 沒有目錄時不要留下空快照
+            return
+        try:
+            snapshot.save(self.snapshot_path)
+            logging.info(f"索引快照已寫入 {self.snapshot_path}")
+        except Exception as e:
+            # 唯讀檔案系統 (例如 serverless) 寫不進去不影響服務
+            logging.warning(f"寫入索引快照失敗: {str(e)}")
+
+    def check(self):
+        """檔案變更且已穩定一個檢查週期才重建，回傳是否替換了快照"""
+        with self.lock:
+            self.stats['checks'] += 1
+            signature = file_signature(self.paths)
+            if signature == self.signature:
+                self.pending = None
+                return False
+
+            # 爬蟲多半直接覆寫檔案，等簽章連續兩次相同再讀，避免讀到寫到一半的 JSON
+            if signature != self.pending:
+                self.pending = signature
+                return False
+
+            self.pending = None
+            self.signature = signature
+            digest = content_digest(self.paths)
+            if digest == self.digest:
+                self.stats['skipped'] += 1
+                return False
+            return self._rebuild(digest)
+
+    def reload(self):
+        """不等檔案穩定，立即重建 (供手動觸發)"""
+        with self.lock:
+            self.signature = file_signature(self.paths)
+            self.pending = None
+            return self._rebuild(content_digest(self.paths))
+
+    def _rebuild(self, digest):
+        start = time.time()
+        snapshot = CatalogSnapshot.load(digest[:12])
+
+        old_songs = len(self.current.song_index.songs)
+        if old_songs and not snapshot.song_index.songs:
+            # 讀到空目錄多半是檔案損毀或寫入中，保留舊快照等下次變更
+            logging.warning(f"新目錄沒有任何歌曲，保留目前版本 {self.current.version}")
+            self.stats['failed'] += 1
+            return False
+
+        self.digest = digest
+        self._swap(snapshot)
+        self.stats['reloads'] += 1
+        elapsed = (time.time() - start) * 1000
+        logging.info(f"目錄已更新為版本 {snapshot.version}: {len(snapshot.song_index.songs)} 首歌曲 "
+                     f"(原 {old_songs} 首), 重建耗時 {elapsed:.0f} ms")
+        self._save(snapshot)
+        return True
+
+    def stop(self):
+        self.stop_event.set()
+
+    def get_stats(self):
+        """回傳目前版本與熱更新統計 (啟動中不等待)"""
+        stats = {**self.stats, 'interval': self.interval, 'ready': self.ready.is_set()}
+        snapshot = self._current
+        if snapshot is not None:
+            stats.update({
+                'version': snapshot.version,
+                'source': snapshot.source,
+                'songs': len(snapshot.song_index.songs),
+                'loaded_at': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(snapshot.loaded_at))
+            })
+        return stats
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    path = os.environ.get('CATALOG_SNAPSHOT_PATH', SNAPSHOT_PATH)
+    version = content_digest(WATCH_PATHS)[:12]
+    snapshot = CatalogSnapshot.load(version)
+    if not snapshot.song_index.songs:
+        print("❌ 找不到歌曲目錄，未產生索引快照")
+        sys.exit(1)
+    snapshot.save(path)
+    print(f"✅ 已產生索引快照 {path}: {len(snapshot.song_index.songs)} 首歌曲 (版本 {version})")
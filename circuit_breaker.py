@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+上游斷路器 - 連續失敗後暫停呼叫點歌王 (open)，冷卻後放行試探請求 (half-open)，成功即恢復 (closed)
+"""
+
+import logging
+import threading
+import time
+
+from upstream_client import UpstreamError
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}  # 給 /metrics 使用的數值
+
+
+class CircuitOpenError(UpstreamError):
+    """斷路器開啟中，未呼叫上游"""
+
+    def __init__(self, retry_after=1):
+        super().__init__('台灣點歌王服務暫時無法使用，已改用本地資料')
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    def __init__(self, name='upstream', failure_threshold=5, recovery_timeout=30,
+                 half_open_max_calls=1, ignore=()):
+        self.name = name
+        self.failure_threshold = failure_threshold  # 連續失敗幾次後開啟
+        self.recovery_timeout = recovery_timeout  # 開啟多久後允許試探 (秒)
+        self.half_open_max_calls = half_open_max_calls  # half-open 時同時放行的試探請求數
+        self.ignore = tuple(ignore)  # 不算上游故障的例外 (例如本地速率限制)
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0
+        self.trials = 0
+        self.lock = threading.Lock()
+        self.stats = {'calls': 0, 'failures': 0, 'rejected': 0, 'opened': 0}
+
+    def _transition(self, state):
+        """切換狀態，呼叫時須持有 lock"""
+        if state == self.state:
+            return
+        logging.warning(f"斷路器 {self.name}: {self.state} -> {state}")
+        self.state = state
+        if state == OPEN:
+            self.opened_at = time.monotonic()
+            self.stats['opened'] += 1
+        if state != HALF_OPEN:
+            self.trials = 0
+
+    def _before_call(self):
+        with self.lock:
+            if self.state == OPEN:
+                remaining = self.recovery_timeout - (time.monotonic() - self.opened_at)
+                if remaining > 0:
+                    self.stats['rejected'] += 1
+                    raise CircuitOpenError(retry_after=max(1, round(remaining)))
+                self._transition(HALF_OPEN)
+
+            if self.state == HALF_OPEN:
+                if self.trials >= self.half_open_max_calls:
+                    self.stats['rejected'] += 1
+                    raise CircuitOpenError()
+                self.trials += 1
+
+            self.stats['calls'] += 1
+
+    def _on_success(self):
+        with self.lock:
+            self.failures = 0
+            self._transition(CLOSED)
+
+    def _on_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.stats['failures'] += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self._transition(OPEN)
+
+    def call(self, fn):
+        """經由斷路器呼叫 fn()；開啟中直接拋出 CircuitOpenError"""
+        self._before_call()
+        try:
+            result = fn()
+        except self.ignore:
+            # 未實際送出上游請求，釋放試探名額但不影響狀態
+            with self.lock:
+                if self.state == HALF_OPEN:
+                    self.trials = max(0, self.trials - 1)
+            raise
+        except Exception:
+            self._on_failure()
+            raise
+        self._on_success()
+        return result
+
+    def get_state(self):
+        """回傳目前狀態 (open 冷卻結束時回報 half_open)"""
+        with self.lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.recovery_timeout:
+                return HALF_OPEN
+            return self.state
+
+    def get_stats(self):
+        state = self.get_state()
+        with self.lock:
+            stats = dict(self.stats)
+            stats['consecutive_failures'] = self.failures
+        stats['state'] = state
+        stats['failure_threshold'] = self.failure_threshold
+        stats['recovery_timeout'] = self.recovery_timeout
+        return stats
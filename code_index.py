@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+點歌編號反查索引 - (公司, 編號) 雜湊表 + 各公司排序過的編號陣列 (前綴與範圍查詢)
+純數字的編號另外依數值排序，數字範圍查詢不會把 10013 算進 1000 ~ 2000
+"""
+
+import logging
+import time
+from bisect import bisect_left, bisect_right
+
+from search_index import normalize_text
+from suggest_index import MAX_CHAR
+
+
+def code_row(song, code_info):
+    """組成與 songs_simplified.json 相同格式的單筆記錄"""
+    return {
+        '歌名': song.get('歌名', ''),
+        '歌手': song.get('歌手', ''),
+        '編號': code_info.get('編號', ''),
+        '公司': code_info.get('公司', ''),
+        '語言': song.get('語言', '')
+    }
+
+
+class CodeRange:
+    """排序陣列中的一段範圍，切片時才組成記錄，大範圍查詢不必整段複製"""
+
+    def __init__(self, entries, lo, hi):
+        self.entries = entries
+        self.lo = lo
+        self.hi = hi
+
+    def __len__(self):
+        return self.hi - self.lo
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            raise TypeError('CodeRange 只支援切片')
+        start, stop, _ = item.indices(len(self))
+        return [code_row(song, code_info)
+                for song, code_info in self.entries[self.lo + start:self.lo + stop]]
+
+
+class CodeIndex:
+    def __init__(self, songs):
+        start = time.time()
+        self.codes = {}  # (公司, 編號) -> [(歌曲, 編號資訊)]
+        self.companies = {}  # 公司 -> (依字串排序的編號陣列, 對應的 [(歌曲, 編號資訊)])
+        self.numeric = {}  # 公司 -> (依數值排序的純數字編號陣列, 對應的 [(歌曲, 編號資訊)])
+
+        unsorted = {}
+        for song in songs:
+            for code_info in song.get('編號資訊', []):
+                entry = self._register(song, code_info)
+                if entry is not None:
+                    unsorted.setdefault(entry[0], []).append(entry[1:])
+
+        for company, entries in unsorted.items():
+            entries.sort(key=lambda entry: entry[0])
+            self.companies[company] = (
+                [code for code, _, _ in entries],
+                [(song, code_info) for _, song, code_info in entries]
+            )
+            numeric = sorted(((int(code), song, code_info) for code, song, code_info in entries
+                              if code.isdecimal()), key=lambda entry: entry[0])
+            if numeric:
+                self.numeric[company] = (
+                    [value for value, _, _ in numeric],
+                    [(song, code_info) for _, song, code_info in numeric]
+                )
+
+        elapsed = (time.time() - start) * 1000
+        logging.info(f"編號反查索引建立完成: {len(self.codes)} 個編號, "
+                     f"{len(self.companies)} 家公司, 耗時 {elapsed:.0f} ms")
+
+    @classmethod
+    def from_catalog(cls, catalog):
+        return cls(catalog.get('songs', {}).values())
+
+    def _register(self, song, code_info):
+        """加入雜湊表，回傳 (公司鍵, 編號鍵, 歌曲, 編號資訊)"""
+        company = normalize_text(code_info.get('公司', ''))
+        code = normalize_text(code_info.get('編號', ''))
+        if not company or not code:
+            return None
+        self.codes.setdefault((company, code), []).append((song, code_info))
+        return company, code, song, code_info
+
+    def lookup(self, code, company=None):
+        """完全相符查詢；未指定公司時查詢所有公司"""
+        code = normalize_text(code)
+        if company:
+            companies = [normalize_text(company)]
+        else:
+            companies = list(self.companies)
+
+        rows = []
+        for key in companies:
+            for song, code_info in self.codes.get((key, code), ()):
+                rows.append(code_row(song, code_info))
+        return rows
+
+    def _span(self, sorted_codes, company, start, end):
+        keys, entries = sorted_codes.get(normalize_text(company), ([], []))
+        lo = bisect_left(keys, start)
+        hi = bisect_right(keys, end) if end is not None else len(keys)
+        return CodeRange(entries, lo, max(lo, hi))
+
+    def prefix(self, company, prefix):
+        """某家公司以 prefix 開頭的所有編號"""
+        prefix = normalize_text(prefix)
+        return self._span(self.companies, company, prefix, prefix + MAX_CHAR)
+
+    def range(self, company, start, end):
+        """某家公司介於 start ~ end 之間的編號 (含兩端)
+
+        兩端皆為數字 (end 可省略) 時只比對純數字編號並依數值比較，否則依字串排序比較
+        """
+        start = normalize_text(start)
+        end = normalize_text(end) if end else None
+        if (start or end) and all(bound.isdecimal() for bound in (start, end) if bound):
+            return self._span(self.numeric, company, int(start) if start else 0,
+                              int(end) if end is not None else None)
+        return self._span(self.companies, company, start, end if end is not None else MAX_CHAR)
@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""
+爬蟲回應快取 - 以 (關鍵字, 公司, cusType) 為鍵把 song.aspx 的回應存進 SQLite
+各爬蟲腳本的關鍵字大量重疊，重跑或中斷後續跑時不必再向點歌王重複查詢
+使用方法: python3 crawl_cache.py        (顯示快取統計)
+          python3 crawl_cache.py purge  (刪除過期項目)
+環境變數: CRAWL_CACHE=off 停用，CRAWL_REPLAY=1 只使用快取、不連線
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from upstream_client import UpstreamError
+
+CRAWL_CACHE_PATH = 'data/crawl_cache.sqlite3'
+CRAWL_CACHE_TTL = int(os.environ.get('CRAWL_CACHE_TTL', 12 * 3600))  # 每日排程仍會取得新歌
+
+
+class CacheMiss(UpstreamError):
+    """重播模式下快取中沒有此查詢"""
+
+    def __init__(self, keyword, company, cus_type):
+        super().__init__(f"重播模式: 快取中沒有 {keyword} ({company}/{cus_type})")
+
+
+class CrawlCache:
+    def __init__(self, path=CRAWL_CACHE_PATH, ttl=CRAWL_CACHE_TTL, replay_only=False):
+        """path 為 None 時停用快取 (每次都呼叫上游)；replay_only 時不論是否過期都只讀快取"""
+        self.path = path
+        self.ttl = ttl
+        self.replay_only = replay_only
+        self.lock = threading.Lock()  # 爬蟲線程共用同一個連線
+        self.stats = {'hits': 0, 'misses': 0, 'stored': 0, 'replay_misses': 0}
+        self.db = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self.db = sqlite3.connect(path, check_same_thread=False)
+            self.db.execute('PRAGMA journal_mode=WAL')  # 爬蟲中斷時已寫入的回應不會遺失
+            self.db.execute('''
+                CREATE TABLE IF NOT EXISTS responses (
+                    keyword TEXT NOT NULL,
+                    company TEXT NOT NULL,
+                    cus_type TEXT NOT NULL,
+                    body TEXT NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    expires_at REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (keyword, company, cus_type)
+                )
+            ''')
+            self.db.commit()
+
+    def get(self, keyword, company='全部', cus_type='searchList'):
+        """取得快取的歌曲陣列，沒有或已過期時回傳 None (重播模式不檢查過期)"""
+        if self.db is None:
+            return None
+        key = (keyword, company, cus_type)
+        with self.lock:
+            row = self.db.execute(
+                'SELECT body, expires_at FROM responses WHERE keyword = ? AND company = ? AND cus_type = ?',
+                key).fetchone()
+            if row is None or (not self.replay_only and row[1] < time.time()):
+                self.stats['misses'] += 1
+                return None
+            self.db.execute(
+                'UPDATE responses SET hits = hits + 1 WHERE keyword = ? AND company = ? AND cus_type = ?', key)
+            self.db.commit()
+            self.stats['hits'] += 1
+        return json.loads(row[0])
+
+    def put(self, keyword, company, cus_type, data, ttl=None):
+        """寫入一個成功的回應 (只快取歌曲陣列，錯誤回應不寫入)"""
+        if self.db is None:
+            return
+        now = time.time()
+        ttl = self.ttl if ttl is None else ttl
+        with self.lock:
+            self.db.execute(
+                'INSERT OR REPLACE INTO responses (keyword, company, cus_type, body, fetched_at, expires_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (keyword, company, cus_type, json.dumps(data, ensure_ascii=False), now, now + ttl))
+            self.db.commit()
+            self.stats['stored'] += 1
+
+    def check_replay(self, keyword, company='全部', cus_type='searchList'):
+        """重播模式下快取未命中時拋出 CacheMiss，不送出上游請求"""
+        if self.replay_only:
+            with self.lock:
+                self.stats['replay_misses'] += 1
+            raise CacheMiss(keyword, company, cus_type)
+
+    def fetch(self, keyword, company, cus_type, fetch):
+        """先查快取，未命中才呼叫 fetch() 並寫入快取 (供同步爬蟲使用)"""
+        data = self.get(keyword, company, cus_type)
+        if data is not None:
+            return data
+        self.check_replay(keyword, company, cus_type)
+        data = fetch()
+        self.put(keyword, company, cus_type, data)
+        return data
+
+    def purge_expired(self):
+        """刪除過期項目，回傳刪除數量"""
+        if self.db is None:
+            return 0
+        with self.lock:
+            deleted = self.db.execute('DELETE FROM responses WHERE expires_at < ?', (time.time(),)).rowcount
+            self.db.commit()
+        return deleted
+
+    def get_stats(self):
+        """本次執行的命中統計，hits 即省下的上游請求數"""
+        with self.lock:
+            stats = dict(self.stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else 0
+        stats['replay_only'] = self.replay_only
+        stats['enabled'] = self.db is not None
+        return stats
+
+    def report(self):
+        """整個快取檔的統計 (包含歷次執行累計省下的請求數)"""
+        if self.db is None:
+            return {'enabled': False}
+        with self.lock:
+            entries, fresh, saved = self.db.execute(
+                'SELECT COUNT(*), COALESCE(SUM(expires_at >= ?), 0), COALESCE(SUM(hits), 0) FROM responses',
+                (time.time(),)).fetchone()
+        return {
+            'enabled': True,
+            'path': self.path,
+            'entries': entries,
+            'fresh': fresh,
+            'expired': entries - fresh,
+            'saved_requests': saved,
+            'size_bytes': os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        }
+
+    def log_summary(self):
+        stats = self.get_stats()
+        if not stats['enabled']:
+            return
+        logging.info(f"💾 爬蟲快取: 命中 {stats['hits']} 次 (省下 {stats['hits']} 個請求)，"
+                     f"未命中 {stats['misses']} 次，新寫入 {stats['stored']} 筆"
+                     + (f"，重播模式略過 {stats['replay_misses']} 個查詢" if stats['replay_only'] else ''))
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+
+def request_songs(session, url, params, controller=None, timeout=15):
+    """送出 song.aspx 請求並回傳歌曲陣列，失敗時拋出例外 (失敗的回應不寫入快取)
+
+    controller 為速率控制 bucket (例如 AdaptiveTokenBucket)，請求前等待 token；
+    回應解析成歌曲陣列後才回報成功，HTML 封鎖頁等無法解析的 200 回應與 CrawlEngine 相同視為錯誤
+    """
+    if controller is not None:
+        controller.wait()
+    start = time.perf_counter()
+    try:
+        response = session.get(url, params=params, timeout=timeout)
+        if response.status_code != 200:
+            raise UpstreamError(f"HTTP {response.status_code}")
+        try:
+            data = response.json()
+        except ValueError:
+            raise UpstreamError('搜尋結果不是 JSON')
+        if not isinstance(data, list):
+            raise UpstreamError('搜尋結果格式錯誤')
+    except Exception as e:
+        if controller is not None:
+            controller.observe(error=e)
+        raise
+    if controller is not None:
+        controller.observe(latency=time.perf_counter() - start)
+    return data
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_crawl_cache():
+    """取得行程內共用的爬蟲快取，設定由環境變數決定"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            enabled = os.environ.get('CRAWL_CACHE', 'on').lower() not in ('0', 'off', 'false')
+            replay_only = os.environ.get('CRAWL_REPLAY') == '1'
+            if replay_only and not enabled:
+                logging.warning("CRAWL_REPLAY=1 需要爬蟲快取，已忽略 CRAWL_CACHE=off")
+            path = os.environ.get('CRAWL_CACHE_PATH', CRAWL_CACHE_PATH)
+            _default_cache = CrawlCache(path if enabled or replay_only else None, replay_only=replay_only)
+            if replay_only:
+                logging.info(f"爬蟲重播模式: 只讀取 {path}，不連線點歌王")
+        return _default_cache
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    cache = CrawlCache(os.environ.get('CRAWL_CACHE_PATH', CRAWL_CACHE_PATH))
+    if len(sys.argv) > 1 and sys.argv[1] == 'purge':
+        print(f"🗑️  已刪除 {cache.purge_expired()} 筆過期項目")
+    report = cache.report()
+    print(f"📦 爬蟲快取 {report['path']}: {report['entries']} 筆 "
+          f"(有效 {report['fresh']}，過期 {report['expired']})，{report['size_bytes'] / 1024:.1f} KB")
+    print(f"💾 累計省下 {report['saved_requests']} 個上游請求")
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""
+共用的 asyncio 爬蟲引擎 - 關鍵字來源與結果輸出皆可替換
+各爬蟲腳本只需提供關鍵字清單，請求速度依上游回應以 AIMD 自動調整，不再以固定 sleep 控制
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from urllib.parse import urlparse
+
+import requests
+
+from artifacts import build_all
+from catalog import write_json
+from crawl_cache import CacheMiss, get_crawl_cache
+from rate_limit import UPSTREAM_BURST, UPSTREAM_RATE, AdaptiveTokenBucket, create_bucket
+from upstream_client import UpstreamClient, UpstreamError
+
+SONGS_PATH = 'public/songs_simplified.json'
+
+# 從每秒一個請求起步，回應正常時逐步加速到 CRAWL_MAX_RATE，上游吃緊時減半
+CRAWL_RATE = float(os.environ.get('CRAWL_RATE', 1))
+CRAWL_MAX_RATE = float(os.environ.get('CRAWL_MAX_RATE', 10))
+CRAWL_BURST = int(os.environ.get('CRAWL_BURST', 3))
+CRAWL_CONCURRENCY = int(os.environ.get('CRAWL_CONCURRENCY', 3))
+
+
+def song_id(name, singer, code):
+    """與舊爬蟲腳本相同的去重鍵"""
+    return f"{name}-{singer}-{code}"
+
+
+def categorized(categories):
+    """將 {類別: [關鍵字]} 攤平成關鍵字來源，重複的關鍵字只保留第一次"""
+    seen = set()
+    for terms in categories.values():
+        for term in terms:
+            if term not in seen:
+                seen.add(term)
+                yield term
+
+
+class SongsFileSink:
+    """把點歌王結果合併進 songs_simplified.json，每新增 save_every 首寫檔一次"""
+
+    def __init__(self, path=SONGS_PATH, max_songs=None, song_filter=None, save_every=50):
+        self.path = path
+        self.max_songs = max_songs  # 達到此數量後引擎停止排入新的關鍵字
+        self.song_filter = song_filter  # song_filter(關鍵字, 原始歌曲) 為 False 的歌曲不收錄
+        self.save_every = save_every
+        self.songs = {}
+        self.found = []  # 本次新增的歌曲
+        self.unsaved = 0
+        self.changed = False
+
+    def open(self):
+        """爬取開始前載入現有歌曲"""
+        self.songs = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for song in json.load(f):
+                    self.songs[song_id(song.get('歌名', ''), song.get('歌手', ''), song.get('編號', ''))] = song
+            logging.info(f"載入現有歌曲: {len(self.songs)} 首")
+        except FileNotFoundError:
+            logging.info("沒有找到現有歌曲資料，從空開始")
+        except Exception as e:
+            logging.warning(f"讀取現有歌曲失敗 {self.path}: {str(e)}，從空開始")
+
+    @property
+    def full(self):
+        return self.max_songs is not None and len(self.songs) >= self.max_songs
+
+    def add(self, keyword, results):
+        """合併一個關鍵字的結果，回傳新增歌曲數"""
+        new_count = 0
+        for song in results:
+            if self.song_filter is not None and not self.song_filter(keyword, song):
+                continue
+            key = song_id(song.get('name', ''), song.get('singer', ''), song.get('code', ''))
+            if key in self.songs:
+                continue
+            song_info = {
+                '歌名': song.get('name', ''),
+                '歌手': song.get('singer', ''),
+                '編號': song.get('code', ''),
+                '公司': song.get('company', '')
+            }
+            self.songs[key] = song_info
+            self.found.append(song_info)
+            new_count += 1
+
+        self.unsaved += new_count
+        if self.unsaved >= self.save_every:
+            self.save()
+        return new_count
+
+    def save(self):
+        """寫入歌曲檔 (先寫暫存檔再替換，目錄熱更新不會讀到寫到一半的檔案)"""
+        if not self.unsaved:
+            return
+        write_json(list(self.songs.values()), self.path)
+        self.unsaved = 0
+        self.changed = True
+        logging.info(f"💾 已儲存 {len(self.songs)} 首歌曲到 {self.path}")
+
+    def close(self):
+        """寫入剩餘歌曲，有變更時重建壓縮檔與 manifest (爬取途中 API 會偵測到不符而改送原始檔案)"""
+        self.save()
+        if self.changed:
+            build_all(os.path.dirname(self.path), [os.path.basename(self.path)])
+            self.changed = False
+
+
+class CrawlEngine:
+    def __init__(self, client=None, concurrency=CRAWL_CONCURRENCY, bucket=None, retries=2, timeout=15, cache=None):
+        """concurrency 為每個上游主機同時進行的請求數上限，bucket 控制整體請求速率，cache 為 CrawlCache"""
+        self.concurrency = concurrency
+        self.client = client or UpstreamClient(pool_size=concurrency)
+        self.bucket = bucket or self._default_bucket()
+        self.retries = retries
+        self.timeout = timeout
+        self.cache = cache or get_crawl_cache()
+        self.host_limits = {}
+        self.stats = {'searched': 0, 'failed': 0, 'retried': 0, 'new_songs': 0}
+
+    @staticmethod
+    def _default_bucket():
+        # 設定 UPSTREAM_RATE_FILE 時與 API 的上游請求共用同一份固定額度 (UPSTREAM_RATE/UPSTREAM_BURST)，否則自動調整速率
+        state_path = os.environ.get('UPSTREAM_RATE_FILE')
+        if state_path:
+            return create_bucket(rate=UPSTREAM_RATE, burst=UPSTREAM_BURST, state_path=state_path)
+        return AdaptiveTokenBucket(rate=CRAWL_RATE, max_rate=CRAWL_MAX_RATE, burst=CRAWL_BURST)
+
+    def _host_limit(self, url):
+        host = urlparse(url).netloc
+        if host not in self.host_limits:
+            self.host_limits[host] = asyncio.Semaphore(self.concurrency)
+        return self.host_limits[host]
+
+    async def fetch(self, keyword, company='全部', cus_type='searchList'):
+        """查詢一個關鍵字 (先查爬蟲快取)，暫時性錯誤以指數退避重試"""
+        cached = self.cache.get(keyword, company, cus_type)
+        if cached is not None:
+            return cached
+        self.cache.check_replay(keyword, company, cus_type)
+
+        async with self._host_limit(self.client.base_url):
+            for attempt in range(self.retries + 1):
+                await self.bucket.async_acquire()
+                start = time.perf_counter()
+                try:
+                    results = await self.client.async_search(keyword, company=company, cus_type=cus_type,
+                                                             timeout=self.timeout)
+                    self.bucket.observe(latency=time.perf_counter() - start)
+                    self.cache.put(keyword, company, cus_type, results)
+                    return results
+                except (UpstreamError, requests.exceptions.RequestException) as e:
+                    self.bucket.observe(error=e)
+                    if attempt == self.retries:
+                        raise
+                    self.stats['retried'] += 1
+                    logging.warning(f"搜尋 '{keyword}' 失敗，{2 ** attempt} 秒後重試: {str(e)}")
+                    await asyncio.sleep(2 ** attempt)
+
+    async def _worker(self, keywords, sink, total):
+        # 所有 worker 共用同一個迭代器，事件迴圈為單執行緒，不需要加鎖
+        for keyword in keywords:
+            if getattr(sink, 'full', False):
+                return
+            try:
+                results = await self.fetch(keyword)
+            except CacheMiss:
+                self.stats['failed'] += 1
+                continue
+            except Exception as e:
+                self.stats['failed'] += 1
+                logging.error(f"❌ 搜尋 '{keyword}' 時發生錯誤: {str(e)}")
+                continue
+
+            self.stats['searched'] += 1
+            new_count = sink.add(keyword, results)
+            self.stats['new_songs'] += new_count
+            progress = f"{self.stats['searched'] + self.stats['failed']}/{total}" if total else self.stats['searched']
+            logging.info(f"🔍 [{progress}] '{keyword}': 找到 {len(results)} 首，新增 {new_count} 首")
+
+    async def crawl(self, keywords, sink):
+        """依序取出 keywords 的關鍵字並行查詢；sink 需提供 open()、add(關鍵字, 原始歌曲陣列) 與 close()"""
+        total = len(keywords) if hasattr(keywords, '__len__') else None
+        iterator = iter(keywords)
+        start = time.time()
+        sink.open()
+        try:
+            await asyncio.gather(*(self._worker(iterator, sink, total) for _ in range(self.concurrency)))
+        finally:
+            sink.close()
+            self.cache.log_summary()
+        stats = {**self.stats, 'elapsed': round(time.time() - start, 1), 'rate': round(self.bucket.rate, 2),
+                 'cache_hits': self.cache.get_stats()['hits']}
+        logging.info(f"🎉 爬取完成: 搜尋 {stats['searched']} 次，失敗 {stats['failed']} 次，"
+                     f"新增 {stats['new_songs']} 首，耗時 {stats['elapsed']} 秒，最終速率每秒 {stats['rate']} 次")
+        return stats
+
+    def run(self, keywords, sink):
+        """同步入口，供命令列腳本使用"""
+        try:
+            return asyncio.run(self.crawl(keywords, sink))
+        finally:
+            self.client.close()
+
+
+def run_crawl(keywords, sink=None, warm_up=True, **engine_options):
+    """以預設引擎爬取一組關鍵字並合併進 songs_simplified.json，回傳 (統計, sink)"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    sink = sink or SongsFileSink()
+    engine = CrawlEngine(**engine_options)
+    if warm_up:
+        engine.client.warm_up()
+    return engine.run(keywords, sink), sink
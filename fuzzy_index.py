@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+錯字容忍搜尋 - SymSpell 式刪除索引，找出編輯距離 1~2 以內的歌名與歌手
+"""
+
+import logging
+import time
+from collections import defaultdict
+
+from search_index import normalize_text
+
+PREFIX_LENGTH = 7  # 只對前 7 個字產生刪除變體，控制索引大小
+
+
+def allowed_distance(length):
+    """依字串長度決定可容忍的編輯距離 (短字串容錯太多會誤配)"""
+    if length < 2:
+        return 0
+    if length <= 5:
+        return 1
+    return 2
+
+
+def deletes(text, max_distance):
+    """產生刪除 0 ~ max_distance 個字元後的所有變體"""
+    variants = {text}
+    frontier = {text}
+    for _ in range(max_distance):
+        next_frontier = set()
+        for word in frontier:
+            for i in range(len(word)):
+                next_frontier.add(word[:i] + word[i + 1:])
+        variants |= next_frontier
+        frontier = next_frontier
+    return variants
+
+
+def edit_distance(a, b, max_distance):
+    """含相鄰字元互換的編輯距離 (OSA)，超過 max_distance 時提早回傳 max_distance + 1"""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = current[0]
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous_previous is not None and i > 1 and j > 1
+                    and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+            row_min = min(row_min, current[j])
+        if row_min > max_distance:
+            return max_distance + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+
+class FuzzyIndex:
+    def __init__(self, song_index, max_distance=2):
+        """以 SongIndex 已正規化的歌名/歌手欄位建立刪除索引，歌曲編號與 SongIndex 相同"""
+        start = time.time()
+        self.song_index = song_index
+        self.max_distance = max_distance
+        self.terms = []  # 不重複的歌名/歌手
+        self.term_docs = []  # 每個詞對應的歌曲編號
+        self.deletes = defaultdict(list)  # 刪除變體 -> 詞編號
+
+        term_ids = {}
+        for doc_id, fields in enumerate(song_index.fields):
+            for term in fields:
+                if not term:
+                    continue
+                term_id = term_ids.get(term)
+                if term_id is None:
+                    term_id = len(self.terms)
+                    term_ids[term] = term_id
+                    self.terms.append(term)
+                    self.term_docs.append([])
+                    distance = min(allowed_distance(len(term)), max_distance)
+                    for variant in deletes(term[:PREFIX_LENGTH], distance):
+                        self.deletes[variant].append(term_id)
+                if not self.term_docs[term_id] or self.term_docs[term_id][-1] != doc_id:
+                    self.term_docs[term_id].append(doc_id)
+
+        elapsed = (time.time() - start) * 1000
+        logging.info(f"錯字容忍索引建立完成: {len(self.terms)} 個詞, "
+                     f"{len(self.deletes)} 個刪除變體, 耗時 {elapsed:.0f} ms")
+
+    def _matches(self, keyword):
+        """回傳 [(編輯距離, 詞編號)]，依距離由小到大排列"""
+        query = normalize_text(keyword)
+        distance = min(allowed_distance(len(query)), self.max_distance)
+        if distance == 0:
+            return []
+
+        candidates = set()
+        for variant in deletes(query[:PREFIX_LENGTH], distance):
+            candidates.update(self.deletes.get(variant, ()))
+
+        matches = []
+        for term_id in candidates:
+            # 刪除索引只比對前綴，完整字串仍需確認實際距離
+            found = edit_distance(query, self.terms[term_id], distance)
+            if found <= distance:
+                matches.append((found, term_id))
+        matches.sort(key=lambda item: (item[0], self.terms[item[1]]))
+        return matches
+
+    def search(self, keyword, limit=None):
+        """回傳歌名或歌手與關鍵字相近的歌曲，距離較小者在前"""
+        songs = []
+        seen = set()
+        for _, term_id in self._matches(keyword):
+            for doc_id in self.term_docs[term_id]:
+                if doc_id in seen:
+                    continue
+                seen.add(doc_id)
+                songs.append(self.song_index.songs[doc_id])
+                if limit is not None and len(songs) >= limit:
+                    return songs
+        return songs
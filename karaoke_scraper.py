@@ -6,10 +6,12 @@ import json
 import os
 from urllib.parse import quote
 import uuid
-import time
 from datetime import datetime
 from pathlib import Path
 
+from crawl_cache import CacheMiss, get_crawl_cache, request_songs
+from rate_limit import AdaptiveTokenBucket
+
 # 設定日誌
 logging.basicConfig(
     level=logging.INFO,
@@ -38,7 +40,12 @@ class KaraokeScraper:
             'dnt': '1',
             'priority': 'u=0, i'
         }
+        self.session.headers.update(self.headers)
         self.uuid = str(uuid.uuid4())  # 生成唯一識別碼
+        # 依上游回應自動調整請求速率，取代固定的 sleep
+        self.rate_controller = AdaptiveTokenBucket(rate=1, max_rate=5)
+        # 與其他爬蟲共用的回應快取，重跑時已查過的分頁與關鍵字不再連線
+        self.crawl_cache = get_crawl_cache()
         self.all_songs = []
         self.checkpoint_file = "scrape_checkpoint.json"
         self.data_dir = Path("data")
@@ -80,11 +87,13 @@ class KaraokeScraper:
                   f"&cusType=searchList"
                   f"&keyword={quote(keyword)}")
             
-            self.headers['Referer'] = f"{self.base_url}/songs.aspx?company={quote('全部')}&keyword={quote(keyword)}"
+            # 每個請求使用獨立的標頭副本，避免多執行緒同時修改共用的 Referer
+            headers = dict(self.headers)
+            headers['Referer'] = f"{self.base_url}/songs.aspx?company={quote('全部')}&keyword={quote(keyword)}"
             
             logging.info(f"正在搜尋: {keyword}")
             
-            response = self.session.get(url, headers=self.headers)
+            response = self.session.get(url, headers=headers)
             
             if response.status_code == 200:
                 try:
@@ -148,94 +157,73 @@ class KaraokeScraper:
         offset = start_offset
         retry_count = 0
         max_retries = 3
+        url = f"{self.base_url}/api/song.aspx"
 
         while True:
+            params = {
+                'company': company,
+                'cusType': 'searchList',
+                'offset': offset,
+                'limit': batch_size
+            }
             try:
-                url = (f"{self.base_url}/api/song.aspx"
-                      f"?company={quote(company)}"
-                      f"&cusType=searchList"
-                      f"&offset={offset}"
-                      f"&limit={batch_size}")
-                
-                response = self.session.get(url, headers=self.headers)
-                
-                # 檢查響應內容
-                try:
-                    response_text = response.text.strip()
-                    if not response_text:
-                        logging.warning(f"收到空響應，offset: {offset}")
-                        break
-                    
-                    data = response.json()
-                    if not data:
-                        break
-                    
-                    if isinstance(data, list):
-                        new_songs = [song for song in data if song['code'] not in {s['code'] for s in self.all_songs}]
-                        self.all_songs.extend(new_songs)
-                        logging.info(f"已抓取 {len(self.all_songs)} 首歌曲 (新增 {len(new_songs)} 首)")
-                    else:
-                        logging.warning(f"意外的響應格式: {response_text[:100]}")
-                        break
-                    
-                    # 每100首歌保存一次進度
-                    if len(self.all_songs) % 100 == 0:
-                        self.save_checkpoint(offset)
-                    
-                    offset += batch_size
-                    time.sleep(1)
-                    retry_count = 0
-
-                except json.JSONDecodeError as e:
-                    logging.error(f"JSON 解析錯誤: {e}")
-                    logging.debug(f"響應內容: {response_text[:100]}")
-                    if retry_count < max_retries:
-                        retry_count += 1
-                        time.sleep(5)
-                        continue
-                    break
-
+                # 分頁查詢沒有關鍵字，快取鍵以查詢類型區分不同的 offset 與 limit
+                data = self.crawl_cache.fetch(
+                    '', company, f"searchList&offset={offset}&limit={batch_size}",
+                    lambda: request_songs(self.session, url, params, self.rate_controller)
+                )
+            except CacheMiss as e:
+                logging.warning(str(e))
+                break
             except Exception as e:
-                logging.error(f"抓取出錯: {e}")
+                # 速率控制器已依錯誤降速，重試時會自動放慢
+                logging.error(f"抓取出錯 (offset: {offset}): {e}")
                 if retry_count < max_retries:
                     retry_count += 1
-                    time.sleep(5)
                     continue
                 break
 
+            if not data:
+                break
+
+            new_songs = [song for song in data if song['code'] not in {s['code'] for s in self.all_songs}]
+            self.all_songs.extend(new_songs)
+            logging.info(f"已抓取 {len(self.all_songs)} 首歌曲 (新增 {len(new_songs)} 首)")
+
+            # 每100首歌保存一次進度
+            if len(self.all_songs) % 100 == 0:
+                self.save_checkpoint(offset)
+
+            offset += batch_size
+            retry_count = 0
+
     def scrape_by_letter(self, start_index=0):
         """通過字母和數字遍歷搜索"""
         characters = list("一二三四五六七八九十月年日天春夏秋冬愛情")
-        retry_count = 0
-        max_retries = 3
+        url = f"{self.base_url}/api/song.aspx"
 
         for i, char in enumerate(characters[start_index:], start_index):
+            params = {
+                'company': '全部',
+                'cusType': 'searchList',
+                'keyword': char
+            }
             try:
-                url = (f"{self.base_url}/api/song.aspx"
-                      f"?company=全部"
-                      f"&cusType=searchList"
-                      f"&keyword={quote(char)}")
-                
-                response = self.session.get(url, headers=self.headers)
-                if response.status_code == 200:
-                    data = response.json()
-                    if data:
-                        new_songs = [song for song in data if song['code'] not in {s['code'] for s in self.all_songs}]
-                        self.all_songs.extend(new_songs)
-                        logging.info(f"搜索 '{char}' 找到 {len(new_songs)} 首新歌曲")
-                        
-                        # 每個字符處理完後保存進度
-                        self.save_checkpoint(char_index=i)
-                
-                time.sleep(1)
-                retry_count = 0
-
+                data = self.crawl_cache.fetch(
+                    char, '全部', 'searchList',
+                    lambda: request_songs(self.session, url, params, self.rate_controller)
+                )
             except Exception as e:
                 logging.error(f"搜索 '{char}' 時出錯: {e}")
-                if retry_count < max_retries:
-                    retry_count += 1
-                    time.sleep(5)
-                    continue
+                continue
+
+            if data:
+                new_songs = [song for song in data if song['code'] not in {s['code'] for s in self.all_songs}]
+                self.all_songs.extend(new_songs)
+                logging.info(f"搜索 '{char}' 找到 {len(new_songs)} 首新歌曲")
+
+                # 每個字符處理完後保存進度
+                self.save_checkpoint(char_index=i)
 
     def save_results(self):
         """保存所有結果"""
@@ -316,6 +304,7 @@ class KaraokeScraper:
         
         # 保存結果
         self.save_results()
+        self.crawl_cache.log_summary()
         
         # 清理checkpoint文件
         if os.path.exists(self.checkpoint_file):
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+Prometheus 文字格式指標 - 計數器、量表、直方圖，不需額外安裝 prometheus_client
+注意：指標存在各行程記憶體中，gunicorn 多個 worker 時每個 worker 各自計數
+"""
+
+import threading
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 15, 30)
+SIZE_BUCKETS = (0, 1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    kind = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f'{self.name} 需要標籤 {self.labelnames}')
+        return tuple((name, labels[name]) for name in self.labelnames)
+
+    def samples(self):
+        """回傳 [(名稱後綴, 標籤, 值)]"""
+        with self.lock:
+            return [('', key, value) for key, value in self.values.items()]
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        for suffix, labels, value in self.samples():
+            lines.append(f'{self.name}{suffix}{_format_labels(labels)} {_format_value(value)}')
+        return lines
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = value
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state['counts'][i] += 1
+                    break
+            state['sum'] += value
+
+    def samples(self):
+        samples = []
+        with self.lock:
+            for key, state in self.values.items():
+                cumulative = 0
+                for bound, count in zip(self.buckets, state['counts']):
+                    cumulative += count
+                    samples.append(('_bucket', key + (('le', _format_value(bound)),), cumulative))
+                samples.append(('_sum', key, state['sum']))
+                samples.append(('_count', key, cumulative))
+        return samples
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []  # 匯出時才呼叫，回傳 [Metric]，用於既有的統計資料
+        self.lock = threading.Lock()
+
+    def register(self, metric):
+        with self.lock:
+            self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector):
+        with self.lock:
+            self.collectors.append(collector)
+
+    def render(self):
+        """輸出 Prometheus 文字格式 (version 0.0.4)"""
+        with self.lock:
+            metrics = list(self.metrics)
+            collectors = list(self.collectors)
+
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        for collector in collectors:
+            for metric in collector():
+                lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+# 上游 song.aspx 相關指標 (由 upstream_client 記錄)
+UPSTREAM_LATENCY = REGISTRY.histogram(
+    'karaoke_upstream_request_duration_seconds', '上游 song.aspx 請求耗時', ['endpoint'])
+UPSTREAM_RESPONSES = REGISTRY.counter(
+    'karaoke_upstream_responses_total', '上游回應的 HTTP 狀態碼', ['endpoint', 'status'])
+UPSTREAM_TIMEOUTS = REGISTRY.counter(
+    'karaoke_upstream_timeouts_total', '上游請求逾時次數', ['endpoint'])
+UPSTREAM_ERRORS = REGISTRY.counter(
+    'karaoke_upstream_errors_total', '上游請求失敗次數 (連線錯誤、格式錯誤)', ['endpoint', 'reason'])
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+分頁工具 - 不透明的 cursor 字串、NDJSON 逐行輸出與 SSE 事件
+"""
+
+import base64
+import json
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(offset):
+    """將位移編碼成不透明的 cursor"""
+    return base64.urlsafe_b64encode(f"o:{offset}".encode('ascii')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """解碼 cursor，格式錯誤時拋出 ValueError"""
+    if not cursor:
+        return 0
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        text = base64.urlsafe_b64decode(padded.encode('ascii')).decode('ascii')
+    except Exception:
+        raise ValueError('cursor 格式錯誤')
+    if not text.startswith('o:') or not text[2:].isdigit():
+        raise ValueError('cursor 格式錯誤')
+    return int(text[2:])
+
+
+def parse_limit(value, default=DEFAULT_PAGE_SIZE):
+    """解析查詢字串或 JSON 的 limit 並限制在 1 到 MAX_PAGE_SIZE 之間，不是整數時拋出 ValueError"""
+    if value is None:
+        return default
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        raise ValueError('limit 必須是整數')
+    try:
+        limit = int(value)
+    except TypeError:
+        raise ValueError('limit 必須是整數')
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def parse_page_args(args):
+    """從查詢參數取得 (limit, offset)，格式錯誤時拋出 ValueError"""
+    limit = int(args.get('limit', DEFAULT_PAGE_SIZE))
+    if limit < 1:
+        raise ValueError('limit 必須大於 0')
+    return min(limit, MAX_PAGE_SIZE), decode_cursor(args.get('cursor'))
+
+
+def page_slice(items, offset, limit):
+    """回傳 (本頁資料, 下一頁 cursor)，最後一頁的 cursor 為 None"""
+    end = offset + limit
+    next_cursor = encode_cursor(end) if end < len(items) else None
+    return items[offset:end], next_cursor
+
+
+def iter_ndjson(items, transform=None):
+    """逐筆輸出 NDJSON，每行一首歌"""
+    for item in items:
+        if transform is not None:
+            item = transform(item)
+        yield json.dumps(item, ensure_ascii=False) + '\n'
+
+
+def sse_event(event, data):
+    """組成一個 Server-Sent Events 事件，data 以單行 JSON 輸出"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+查詢紀錄與需求導向的爬蟲佇列 (方案C: 需求收集、智能優先)
+API 把正規化後的查詢與結果數寫入輪替的純文字紀錄，彙整後產生依需求排序的爬蟲佇列
+使用方法: python3 query_log.py         (彙整紀錄並寫入 data/crawl_queue.json)
+          python3 query_log.py rotate  (輪替紀錄檔，建議每日排程執行)
+"""
+
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+
+from catalog import load_catalog, load_singers_data
+from response_cache import normalize_keyword
+from search_index import normalize_text
+
+QUERY_LOG_PATH = 'data/query_log.tsv'
+CRAWL_QUEUE_PATH = 'data/crawl_queue.json'
+
+BACKUP_COUNT = 5  # rotate_logs 保留的舊檔數
+ERROR_MARK = 'error'  # 上游查詢失敗時結果數欄位的值
+
+HALF_LIFE_DAYS = 7  # 越近的查詢權重越高
+ZERO_RESULT_BOOST = 3  # 查無結果代表目錄缺歌，優先補齊
+
+
+class QueryLog:
+    """每行一筆: 時間戳記<TAB>結果數<TAB>路由<TAB>關鍵字；寫檔在背景執行緒進行，不拖慢請求
+
+    第一次寫入時才建立目錄與背景執行緒，匯入 app 不會產生檔案或執行緒。
+    多個 gunicorn worker 以附加模式寫同一個檔案，輪替由 rotate_logs (python3 query_log.py rotate
+    或 logrotate) 在外部進行，各 worker 的 WatchedFileHandler 偵測到檔案被移走後自動重新開檔。
+    """
+
+    def __init__(self, path=QUERY_LOG_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.logger = None
+        self.listener = None
+
+    def _start(self):
+        with self.lock:
+            if self.logger is not None:
+                return
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+            handler = logging.handlers.WatchedFileHandler(self.path, encoding='utf-8')
+            handler.setFormatter(logging.Formatter('%(message)s'))
+
+            log_queue = queue.Queue()
+            self.listener = logging.handlers.QueueListener(log_queue, handler)
+            self.listener.start()
+
+            logger = logging.getLogger(f'query_log.{os.path.abspath(self.path)}')
+            logger.setLevel(logging.INFO)
+            logger.propagate = False  # 不寫進一般日誌
+            logger.handlers = [logging.handlers.QueueHandler(log_queue)]
+            self.logger = logger
+
+    def record(self, keyword, result_count, route=''):
+        """result_count 為 None 表示上游查詢失敗，彙整時不視為查無結果"""
+        key = normalize_keyword(keyword).replace('\t', ' ')
+        if not key:
+            return
+        if self.logger is None:
+            self._start()
+        count = ERROR_MARK if result_count is None else result_count
+        self.logger.info(f"{int(time.time())}\t{count}\t{route}\t{key}")
+
+    def close(self):
+        if self.listener is not None:
+            self.listener.stop()
+
+
+def rotate_logs(path=QUERY_LOG_PATH, backup_count=BACKUP_COUNT):
+    """將 path 輪替為 path.1 (舊檔依序往後移，超過 backup_count 的刪除)，供排程在 API 外部執行"""
+    if not os.path.exists(path):
+        return False
+    oldest = f"{path}.{backup_count}"
+    if os.path.exists(oldest):
+        os.remove(oldest)
+    for i in range(backup_count - 1, 0, -1):
+        if os.path.exists(f"{path}.{i}"):
+            os.replace(f"{path}.{i}", f"{path}.{i + 1}")
+    os.replace(path, f"{path}.1")
+    return True
+
+
+def iter_log_records(path=QUERY_LOG_PATH, backup_count=BACKUP_COUNT):
+    """依時間由舊到新讀取紀錄 (含輪替的舊檔)，回傳 (時間戳記, 結果數, 路由, 關鍵字)，上游錯誤的結果數為 None"""
+    paths = [f"{path}.{i}" for i in range(backup_count, 0, -1)] + [path]
+    for log_path in paths:
+        if not os.path.exists(log_path):
+            continue
+        with open(log_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                parts = line.rstrip('\n').split('\t')
+                if len(parts) != 4:
+                    continue
+                try:
+                    result_count = None if parts[1] == ERROR_MARK else int(parts[1])
+                    yield int(parts[0]), result_count, parts[2], parts[3]
+                except ValueError:
+                    continue
+
+
+def known_singers():
+    """目錄中的歌手 (正規化名稱 -> 原名)，用來區分歌手查詢與一般關鍵字"""
+    singers = {}
+    catalog, _ = load_catalog()
+    for song in catalog.get('songs', {}).values():
+        singer = song.get('歌手', '')
+        if singer:
+            singers.setdefault(normalize_text(singer), singer)
+    for singer in load_singers_data() or {}:
+        singers.setdefault(normalize_text(singer), singer)
+    return singers
+
+
+def aggregate(records, singers=None, now=None, half_life_days=HALF_LIFE_DAYS):
+    """把紀錄彙整成依需求分數排序的佇列"""
+    now = now or time.time()
+    singers = singers or {}
+    half_life = half_life_days * 86400
+    entries = {}
+
+    for timestamp, result_count, _, keyword in records:
+        key = normalize_text(keyword)
+        if not key:
+            continue
+        entry = entries.get(key)
+        if entry is None:
+            entry = entries[key] = {'forms': {}, 'count': 0, 'zero_results': 0, 'errors': 0,
+                                    'score': 0.0, 'last_seen': 0}
+
+        weight = 0.5 ** (max(0, now - timestamp) / half_life)
+        if result_count is None:
+            # 上游失敗不代表目錄缺歌，只計入一般需求
+            entry['errors'] += 1
+        elif result_count == 0:
+            entry['zero_results'] += 1
+            weight *= ZERO_RESULT_BOOST
+        entry['score'] += weight
+        entry['count'] += 1
+        entry['last_seen'] = max(entry['last_seen'], timestamp)
+        entry['forms'][keyword] = entry['forms'].get(keyword, 0) + 1
+
+    crawl_queue = []
+    for key, entry in entries.items():
+        # 同一個正規化鍵保留最常見的寫法 (紀錄中已是 normalize_keyword 後的小寫形式)，歌手則改用目錄中的原名
+        keyword = max(entry['forms'].items(), key=lambda item: item[1])[0]
+        crawl_queue.append({
+            'keyword': singers.get(key, keyword),
+            'type': 'singer' if key in singers else 'keyword',
+            'score': round(entry['score'], 3),
+            'count': entry['count'],
+            'zero_results': entry['zero_results'],
+            'errors': entry['errors'],
+            'last_seen': datetime.fromtimestamp(entry['last_seen']).strftime('%Y-%m-%d %H:%M:%S')
+        })
+    crawl_queue.sort(key=lambda item: (-item['score'], item['keyword']))
+    return crawl_queue
+
+
+def build_crawl_queue(log_path=QUERY_LOG_PATH, queue_path=CRAWL_QUEUE_PATH):
+    """彙整查詢紀錄並寫入爬蟲佇列檔"""
+    crawl_queue = aggregate(iter_log_records(log_path), known_singers())
+    os.makedirs(os.path.dirname(os.path.abspath(queue_path)), exist_ok=True)
+    tmp_path = f"{queue_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            '產生時間': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'queue': crawl_queue
+        }, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, queue_path)
+    return crawl_queue
+
+
+def load_crawl_queue(kind=None, limit=None, path=CRAWL_QUEUE_PATH):
+    """讀取爬蟲佇列的關鍵字，kind 為 'singer' 或 'keyword' 時只取該類型；沒有佇列檔時回傳空陣列"""
+    if not os.path.exists(path):
+        return []
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            items = json.load(f).get('queue', [])
+    except Exception as e:
+        logging.warning(f"讀取爬蟲佇列失敗 {path}: {str(e)}")
+        return []
+    keywords = [item['keyword'] for item in items if kind is None or item.get('type') == kind]
+    return keywords[:limit] if limit else keywords
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if len(sys.argv) > 1 and sys.argv[1] == 'rotate':
+        rotated = rotate_logs(os.environ.get('QUERY_LOG_PATH', QUERY_LOG_PATH))
+        print("✅ 查詢紀錄已輪替" if rotated else "沒有需要輪替的查詢紀錄")
+        sys.exit(0)
+    result = build_crawl_queue()
+    print(f"✅ 爬蟲佇列已更新: {len(result)} 個關鍵字")
+    for i, item in enumerate(result[:20], 1):
+        print(f"  {i:2d}. {item['keyword']} ({item['type']}, 分數 {item['score']}, "
+              f"查詢 {item['count']} 次, 查無結果 {item['zero_results']} 次)")
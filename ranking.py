@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+搜尋結果排序 - 完全相符 > 開頭相符 > 包含，歌名權重高於歌手，短歌名加分
+分頁只需要前 k 筆時以 heap 取前 k 名，不必排序全部候選
+"""
+
+import heapq
+
+from catalog import flatten_song, song_record
+
+EXACT = 3
+PREFIX = 2
+SUBSTRING = 1
+
+TITLE_WEIGHT = 100
+SINGER_WEIGHT = 80  # 歌手完全相符 (240) 仍排在歌名開頭相符 (200) 之前
+SHORT_TITLE_BONUS = 10  # 小於各級距之間的差距，只影響同一級內的順序
+
+
+def match_type(query, value):
+    """回傳相符等級，不相符為 0"""
+    if not value:
+        return 0
+    if value == query:
+        return EXACT
+    if value.startswith(query):
+        return PREFIX
+    if query in value:
+        return SUBSTRING
+    return 0
+
+
+def score_fields(query, fields):
+    """fields 為正規化後的 (歌名, 歌手)"""
+    title, singer = fields
+    score = max(match_type(query, title) * TITLE_WEIGHT, match_type(query, singer) * SINGER_WEIGHT)
+    return score + SHORT_TITLE_BONUS / (1 + len(title))
+
+
+def top_k(scored, k):
+    """scored: [(分數, -歌曲編號)]，回傳前 k 名 (k 為 None 時全部排序)"""
+    if k is None or k >= len(scored):
+        return sorted(scored, reverse=True)
+    return heapq.nlargest(k, scored)
+
+
+class RankedRows:
+    """依排序展開的逐筆編號記錄；切片時只取出涵蓋該頁所需的前 k 首歌"""
+
+    def __init__(self, songs, scored):
+        self.songs = songs
+        self.scored = scored
+        self.total = sum(len(songs[-neg_id].get('編號資訊', [])) for _, neg_id in scored)
+        self.rows = []
+        self.ranked_songs = 0  # self.rows 已涵蓋的歌曲數
+
+    def __len__(self):
+        return self.total
+
+    def _fill(self, count):
+        """展開足夠的歌曲直到至少有 count 筆記錄"""
+        k = max(count, 1)
+        while len(self.rows) < count and self.ranked_songs < len(self.scored):
+            ranked = top_k(self.scored, k)
+            self.rows = []
+            for _, neg_id in ranked:
+                self.rows.extend(flatten_song(self.songs[-neg_id]))
+            self.ranked_songs = len(ranked)
+            k *= 2  # 沒有編號的歌曲不產生記錄，不足時擴大 k 再取
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            raise TypeError('RankedRows 只支援切片')
+        start, stop, _ = item.indices(self.total)
+        self._fill(stop)
+        return self.rows[start:stop]
+
+
+class RankedSongs:
+    """依排序的歌曲 (統一資料庫格式，每首歌一筆)；切片時只取前 k 名"""
+
+    def __init__(self, songs, scored):
+        self.songs = songs
+        self.scored = scored
+
+    def __len__(self):
+        return len(self.scored)
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            raise TypeError('RankedSongs 只支援切片')
+        start, stop, _ = item.indices(len(self.scored))
+        ranked = top_k(self.scored, stop)
+        return [song_record(self.songs[-neg_id]) for _, neg_id in ranked[start:stop]]
@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+"""
+上游請求速率限制 - token bucket + 有上限的等待佇列，額度用完時快速拒絕而不是堆積執行緒
+設定 state_path 時以檔案鎖在多個 gunicorn worker 之間共用同一個 bucket
+AdaptiveTokenBucket 依上游回應以 AIMD 調整速率，供爬蟲使用
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+
+import requests
+
+try:
+    import fcntl
+except ImportError:  # Windows 沒有 fcntl，只能使用單一行程的 bucket
+    fcntl = None
+
+from upstream_client import UpstreamError
+
+# API 與爬蟲以 UPSTREAM_RATE_FILE 共用 bucket 時必須使用相同的速率與容量，否則各自以不同參數補充同一個狀態檔
+UPSTREAM_RATE = float(os.environ.get('UPSTREAM_RATE', 5))
+UPSTREAM_BURST = int(os.environ.get('UPSTREAM_BURST', 10))
+
+
+class RateLimitExceeded(UpstreamError):
+    """上游請求額度已用完"""
+
+    def __init__(self, retry_after=1):
+        super().__init__('上游查詢過於頻繁，請稍後再試')
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    def __init__(self, rate=5, burst=10, max_waiters=20, max_wait=2):
+        self.rate = rate  # 每秒補充的 token 數
+        self.burst = burst  # bucket 容量 (允許的瞬間請求數)
+        self.max_waiters = max_waiters  # 同時等待 token 的請求上限，超過直接拒絕
+        self.max_wait = max_wait  # 單一請求最多等待秒數
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+        self.waiting = 0
+        self.stats = {'granted': 0, 'waited': 0, 'rejected': 0}
+
+    def _try_take(self):
+        """取得一個 token 回傳 0，否則回傳還需等待的秒數"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) / self.rate
+
+    def _count(self, result):
+        with self.lock:
+            self.stats[result] += 1
+
+    def acquire(self, timeout=None):
+        """取得 token；等待佇列已滿或無法在 timeout 內取得時回傳 False"""
+        timeout = self.max_wait if timeout is None else timeout
+        wait = self._try_take()
+        if wait == 0:
+            self._count('granted')
+            return True
+
+        with self.lock:
+            if self.waiting >= self.max_waiters:
+                self.stats['rejected'] += 1
+                return False
+            self.waiting += 1
+
+        try:
+            deadline = time.monotonic() + timeout
+            while True:
+                # 確定等不到就立刻拒絕，不必佔著執行緒到逾時
+                if time.monotonic() + wait > deadline:
+                    self._count('rejected')
+                    return False
+                time.sleep(wait)
+                wait = self._try_take()
+                if wait == 0:
+                    self._count('waited')
+                    return True
+        finally:
+            with self.lock:
+                self.waiting -= 1
+
+    def wait(self):
+        """阻塞直到取得 token，不設等待上限 (供爬蟲執行緒使用)"""
+        wait = self._try_take()
+        if not wait:
+            self._count('granted')
+            return
+        while wait:
+            time.sleep(wait)
+            wait = self._try_take()
+        self._count('waited')
+
+    def observe(self, response=None, error=None, latency=0):
+        """回報一次上游請求的結果；固定速率的 bucket 不需要調整"""
+        return failure_reason(response, error)
+
+    async def async_acquire(self):
+        """asyncio 版本：等待 token 時讓出事件迴圈，不設等待上限 (供背景爬蟲使用)"""
+        wait = self._try_take()
+        if wait:
+            with self.lock:
+                self.waiting += 1
+            try:
+                while wait:
+                    await asyncio.sleep(wait)
+                    wait = self._try_take()
+            finally:
+                with self.lock:
+                    self.waiting -= 1
+            self._count('waited')
+        else:
+            self._count('granted')
+
+    def call(self, fn):
+        """取得 token 後呼叫 fn()，額度用完時拋出 RateLimitExceeded"""
+        if not self.acquire():
+            raise RateLimitExceeded(retry_after=max(1, round(1 / self.rate)))
+        return fn()
+
+    def get_stats(self):
+        with self.lock:
+            stats = dict(self.stats)
+            stats['waiting'] = self.waiting
+        stats['rate'] = self.rate
+        stats['burst'] = self.burst
+        stats['max_waiters'] = self.max_waiters
+        stats['shared'] = False
+        return stats
+
+
+def failure_reason(response=None, error=None):
+    """判斷上游是否過載：逾時、連線錯誤、429、5xx 或空回應時回傳原因，正常回傳 None"""
+    if error is not None:
+        if isinstance(error, requests.exceptions.Timeout):
+            return 'timeout'
+        if isinstance(error, requests.exceptions.RequestException):
+            return 'connection'
+        return str(error) or type(error).__name__
+    if response is None:
+        return None
+    if response.status_code == 429 or response.status_code >= 500:
+        return f'HTTP {response.status_code}'
+    if not response.content.strip():
+        return 'empty'
+    return None
+
+
+class AdaptiveTokenBucket(TokenBucket):
+    """AIMD 速率控制：回應快且成功時每 increase_interval 秒最多加一次 increase，過載訊號出現時乘上 backoff"""
+
+    def __init__(self, rate=1, min_rate=0.2, max_rate=10, increase=0.1, backoff=0.5, slow_after=3,
+                 increase_interval=1, burst=1, max_waiters=100, max_wait=60):
+        super().__init__(rate=rate, burst=burst, max_waiters=max_waiters, max_wait=max_wait)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.backoff = backoff
+        self.slow_after = slow_after  # 回應超過此秒數視為上游吃緊，不再加速
+        self.increase_interval = increase_interval  # 加速的最短間隔，速率隨時間線性成長而非隨請求數
+        self.last_increase = 0
+        self.last_decrease = 0
+        self.stats.update({'increased': 0, 'decreased': 0})
+
+    def observe(self, response=None, error=None, latency=0):
+        """依回應調整速率，回傳失敗原因 (成功為 None)"""
+        reason = failure_reason(response, error)
+        with self.lock:
+            now = time.monotonic()
+            if reason is None:
+                # 每次成功都加速會讓速率隨請求數成長 (速率越高加得越快)，限制為每個間隔一次
+                if (latency <= self.slow_after and self.rate < self.max_rate
+                        and now - self.last_increase >= self.increase_interval):
+                    self.rate = min(self.max_rate, self.rate + self.increase)
+                    self.last_increase = now
+                    self.stats['increased'] += 1
+                return None
+
+            # 同時在途的請求常一起失敗，降速後一個請求間隔內的失敗不再重複降速
+            if now - self.last_decrease < 1 / self.rate:
+                return reason
+            self.rate = max(self.min_rate, self.rate * self.backoff)
+            self.last_decrease = now
+            self.stats['decreased'] += 1
+            rate = self.rate
+        logging.warning(f"上游回應異常 ({reason})，請求速率降為每秒 {rate:.2f} 次")
+        return reason
+
+    def get_stats(self):
+        stats = super().get_stats()
+        stats['rate'] = round(self.rate, 3)
+        stats['adaptive'] = True
+        return stats
+
+
+class SharedTokenBucket(TokenBucket):
+    """狀態存在檔案中，以 flock 讓同一台機器上的多個 worker 共用額度"""
+
+    def __init__(self, state_path, **kwargs):
+        super().__init__(**kwargs)
+        self.state_path = state_path
+
+    def _try_take(self):
+        with open(self.state_path, 'a+', encoding='utf-8') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                try:
+                    state = json.loads(f.read() or '{}')
+                except ValueError:
+                    state = {}
+                # 跨行程需使用牆上時鐘
+                now = time.time()
+                tokens = state.get('tokens', self.burst)
+                updated = state.get('updated', now)
+                tokens = min(self.burst, tokens + max(0, now - updated) * self.rate)
+
+                wait = 0
+                if tokens >= 1:
+                    tokens -= 1
+                else:
+                    wait = (1 - tokens) / self.rate
+
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps({'tokens': tokens, 'updated': now}))
+                f.flush()
+                return wait
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def get_stats(self):
+        stats = super().get_stats()
+        stats['shared'] = True
+        return stats
+
+
+def create_bucket(rate=5, burst=10, max_waiters=20, max_wait=2, state_path=None):
+    """有設定 state_path 且平台支援 flock 時建立跨 worker 的 bucket"""
+    if state_path and fcntl is not None:
+        os.makedirs(os.path.dirname(os.path.abspath(state_path)), exist_ok=True)
+        logging.info(f"上游速率限制跨 worker 共用: {state_path}")
+        return SharedTokenBucket(state_path, rate=rate, burst=burst,
+                                 max_waiters=max_waiters, max_wait=max_wait)
+    if state_path:
+        logging.warning("此平台不支援 flock，上游速率限制僅在單一行程內生效")
+    return TokenBucket(rate=rate, burst=burst, max_waiters=max_waiters, max_wait=max_wait)
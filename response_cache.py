@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+上游回應快取 - TTL + LRU，過期後在寬限期內先回傳舊資料並於背景更新
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_keyword(keyword):
+    """快取鍵：去除多餘空白並統一大小寫"""
+    return ' '.join(str(keyword).split()).lower()
+
+
+class ResponseCache:
+    def __init__(self, max_entries=512, ttl=300, stale_ttl=1800):
+        self.max_entries = max_entries
+        self.ttl = ttl  # 新鮮期 (秒)
+        self.stale_ttl = stale_ttl  # 過期後仍可先回傳的寬限期 (秒)
+        self.entries = OrderedDict()  # key -> (value, 取得時間)
+        self.refreshing = set()
+        self.lock = threading.Lock()
+        self.stats = {
+            'hits': 0,
+            'stale_hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'refreshes': 0,
+            'refresh_errors': 0
+        }
+
+    def get_or_fetch(self, key, fetch):
+        """取得快取值；沒有可用資料時呼叫 fetch() 並寫入快取"""
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                value, fetched_at = entry
+                age = now - fetched_at
+                if age <= self.ttl:
+                    self.entries.move_to_end(key)
+                    self.stats['hits'] += 1
+                    return value
+                if age <= self.ttl + self.stale_ttl:
+                    self.entries.move_to_end(key)
+                    self.stats['stale_hits'] += 1
+                    self._schedule_refresh(key, fetch)
+                    return value
+                del self.entries[key]
+            self.stats['misses'] += 1
+
+        value = fetch()
+        self.set(key, value)
+        return value
+
+    def peek(self, key):
+        """只取新鮮的快取值，沒有時回傳 None 且不呼叫上游 (過期值留給 get_or_fetch 處理)
+
+        不計入命中統計：未命中的鍵之後還會經過 get_or_fetch，計入會讓 hit_ratio 偏高
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or time.time() - entry[1] > self.ttl:
+                return None
+            self.entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value):
+        """寫入快取，超過上限時淘汰最久未使用的項目"""
+        with self.lock:
+            self.entries[key] = (value, time.time())
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def _schedule_refresh(self, key, fetch):
+        """啟動背景更新 (同一個鍵同時只會有一個)，呼叫時須持有 lock"""
+        if key in self.refreshing:
+            return
+        self.refreshing.add(key)
+        thread = threading.Thread(target=self._refresh, args=(key, fetch), daemon=True)
+        thread.start()
+
+    def _refresh(self, key, fetch):
+        try:
+            value = fetch()
+            self.set(key, value)
+            with self.lock:
+                self.stats['refreshes'] += 1
+        except Exception as e:
+            logging.warning(f"快取背景更新失敗 {key}: {str(e)}")
+            with self.lock:
+                self.stats['refresh_errors'] += 1
+        finally:
+            with self.lock:
+                self.refreshing.discard(key)
+
+    def get_stats(self):
+        """回傳命中、未命中與淘汰統計"""
+        with self.lock:
+            stats = dict(self.stats)
+            stats['size'] = len(self.entries)
+        lookups = stats['hits'] + stats['stale_hits'] + stats['misses']
+        stats['hit_ratio'] = round((stats['hits'] + stats['stale_hits']) / lookups, 4) if lookups else 0.0
+        stats['max_entries'] = self.max_entries
+        stats['ttl'] = self.ttl
+        stats['stale_ttl'] = self.stale_ttl
+        return stats
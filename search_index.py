@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+本地搜尋索引 - 以歌名/歌手的單字與雙字 (unigram/bigram) 倒排索引取代逐筆比對
+"""
+
+import logging
+import time
+from collections import defaultdict
+
+from ranking import RankedRows, RankedSongs, score_fields
+from text_normalize import normalize
+
+SEARCH_FIELDS = ('歌名', '歌手')
+
+
+def normalize_text(text):
+    """正規化 (全半形、大小寫、繁簡) 並移除空白，建索引與查詢時使用同一套規則"""
+    return ''.join(normalize(text).split())
+
+
+def text_grams(text):
+    """產生字串的所有單字與雙字片段"""
+    grams = set(text)
+    for i in range(len(text) - 1):
+        grams.add(text[i:i + 2])
+    return grams
+
+
+def query_grams(text):
+    """查詢用片段：長度 1 用單字，其餘用雙字"""
+    if len(text) == 1:
+        return {text}
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+class SongIndex:
+    def __init__(self, songs=None):
+        self.songs = []
+        self.fields = []  # 每首歌正規化後的搜尋欄位
+        self.postings = defaultdict(list)  # 片段 -> 歌曲編號 (遞增排列)
+        for song in songs or []:
+            self.add_song(song)
+
+    @classmethod
+    def from_catalog(cls, catalog):
+        """由統一資料庫格式建立索引"""
+        start = time.time()
+        index = cls(catalog.get('songs', {}).values())
+        elapsed = (time.time() - start) * 1000
+        logging.info(f"本地搜尋索引建立完成: {len(index.songs)} 首歌曲, "
+                     f"{len(index.postings)} 個片段, 耗時 {elapsed:.0f} ms")
+        return index
+
+    def __len__(self):
+        return len(self.songs)
+
+    def add_song(self, song):
+        """加入一首歌並更新倒排索引"""
+        doc_id = len(self.songs)
+        fields = tuple(normalize_text(song.get(field, '')) for field in SEARCH_FIELDS)
+        self.songs.append(song)
+        self.fields.append(fields)
+
+        grams = set()
+        for value in fields:
+            grams |= text_grams(value)
+        for gram in grams:
+            self.postings[gram].append(doc_id)
+        return doc_id
+
+    def candidates(self, query):
+        """交集查詢片段的倒排串列，由最短串列開始"""
+        lists = []
+        for gram in query_grams(query):
+            posting = self.postings.get(gram)
+            if not posting:
+                return set()
+            lists.append(posting)
+
+        lists.sort(key=len)
+        result = set(lists[0])
+        for posting in lists[1:]:
+            result.intersection_update(posting)
+            if not result:
+                break
+        return result
+
+    def scored_matches(self, keyword):
+        """回傳 [(分數, -歌曲編號)]，同分時目錄順序在前"""
+        query = normalize_text(keyword)
+        if not query:
+            return []
+
+        scored = []
+        for doc_id in self.candidates(query):
+            fields = self.fields[doc_id]
+            if any(query in value for value in fields):
+                scored.append((score_fields(query, fields), -doc_id))
+        return scored
+
+    def ranked_rows(self, keyword):
+        """依相關度排序的逐筆編號記錄，分頁切片時才取前 k 名"""
+        return RankedRows(self.songs, self.scored_matches(keyword))
+
+    def ranked_songs(self, keyword):
+        """依相關度排序、每首歌一筆 (編號資訊合併) 的結果"""
+        return RankedSongs(self.songs, self.scored_matches(keyword))
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+歌手索引 - 以正規化後的歌手名稱為鍵的雜湊表，編號資訊在建立時就依公司優先順序排好
+"""
+
+import logging
+import time
+
+from catalog import load_singers_data, sort_code_info
+from search_index import normalize_text
+
+
+def _song_entry(song, singer):
+    """複製一首歌並排序編號資訊 (不修改原本的目錄資料)"""
+    return {
+        '歌名': song.get('歌名', ''),
+        '歌手': song.get('歌手', singer),
+        '語言': song.get('語言', ''),
+        '編號資訊': sort_code_info([dict(code_info) for code_info in song.get('編號資訊', [])])
+    }
+
+
+class SingerIndex:
+    def __init__(self, singers):
+        """singers: {歌手名稱: singers_data.json 格式的歌手資料}"""
+        start = time.time()
+        self.singers = {}  # 正規化歌手名稱 -> 歌手資料
+
+        for name, data in singers.items():
+            key = normalize_text(name)
+            if not key:
+                continue
+
+            entry = {
+                '歌手名稱': data.get('歌手名稱', name),
+                '歌曲清單': [_song_entry(song, name) for song in data.get('歌曲清單', [])]
+            }
+            entry['歌曲數量'] = len(entry['歌曲清單'])
+            if data.get('更新時間'):
+                entry['更新時間'] = data['更新時間']
+
+            existing = self.singers.get(key)
+            if existing is None or entry['歌曲數量'] > existing['歌曲數量']:
+                # 同名異寫 (台/臺、全形/半形) 時保留歌曲較多的那筆
+                self.singers[key] = entry
+
+        elapsed = (time.time() - start) * 1000
+        logging.info(f"歌手索引建立完成: {len(self.singers)} 位歌手, 耗時 {elapsed:.0f} ms")
+
+    @classmethod
+    def from_catalog(cls, catalog):
+        """從統一資料庫依歌手分組建立索引"""
+        singers = {}
+        for song in catalog.get('songs', {}).values():
+            singer = song.get('歌手', '')
+            if not singer:
+                continue
+            data = singers.setdefault(singer, {'歌手名稱': singer, '歌曲清單': []})
+            data['歌曲清單'].append(song)
+        return cls(singers)
+
+    @classmethod
+    def load(cls, catalog, path=None):
+        """優先使用 singers_data.json (含更新時間)，沒有時改用統一資料庫分組"""
+        singers = load_singers_data(path) if path else load_singers_data()
+        if singers:
+            return cls(singers)
+        return cls.from_catalog(catalog)
+
+    def get(self, name):
+        """O(1) 查詢歌手，找不到時回傳 None"""
+        return self.singers.get(normalize_text(name))
+
+    def __len__(self):
+        return len(self.singers)
@@ -7,13 +7,18 @@
 
 import requests
 import json
-import time
 import random
 from urllib.parse import quote
 from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import threading
 from collections import defaultdict
+from text_normalize import dedup_key
+from catalog import sort_code_info, write_json
+from artifacts import build_all
+from query_log import load_crawl_queue
+from crawl_cache import get_crawl_cache, request_songs
+from rate_limit import AdaptiveTokenBucket
 
 class SingerScraper:
     def __init__(self, max_workers=2):
@@ -23,6 +28,10 @@ class SingerScraper:
         self.singer_stats = defaultdict(int)
         self.lock = threading.Lock()
         self.base_url = "https://song.corp.com.tw"
+        # 所有線程共用的速率控制，依上游回應自動加速或退避
+        self.rate_controller = AdaptiveTokenBucket(rate=1, max_rate=5)
+        # 與其他爬蟲共用的回應快取，重跑時已查過的歌手不再連線
+        self.crawl_cache = get_crawl_cache()
         
         # 初始化session池
         for _ in range(max_workers):
@@ -115,23 +124,14 @@ class SingerScraper:
     def search_single_method(self, company, keyword, search_type='searchList'):
         """單一搜尋方法"""
         try:
-            session = self.session_pool[0]
-            url = f"{self.base_url}/api/song.aspx"
             params = {
                 'company': company,
                 'cusType': search_type,
                 'keyword': keyword
             }
-            
-            time.sleep(random.uniform(0.8, 1.5))
-            response = session.get(url, params=params, timeout=15)
-            
-            if response.status_code == 200:
-                data = response.json()
-                if isinstance(data, list) and data:
-                    return data
-            
-            return []
+            data = self.crawl_cache.fetch(keyword, company, search_type, lambda: request_songs(
+                self.session_pool[0], f"{self.base_url}/api/song.aspx", params, self.rate_controller))
+            return data or []
             
         except Exception as e:
             print(f"      💥 搜尋失敗({search_type}): {str(e)}")
@@ -158,6 +158,9 @@ class SingerScraper:
         print(f"\n🎉 {singer_name} 收集完成!")
         print(f"📊 總共找到: {len(unique_songs)} 首歌曲")
         print(f"⏱️  耗時: {elapsed}")
+        cache_stats = self.crawl_cache.get_stats()
+        if cache_stats['enabled']:
+            print(f"💾 爬蟲快取累計省下 {cache_stats['hits']} 個上游請求")
         
         return unique_songs
     
@@ -175,8 +178,8 @@ class SingerScraper:
             if not song_name or not song_singer:
                 continue
             
-            # 使用歌名+歌手作為唯一識別
-            song_key = f"{song_name}--{song_singer}"
+            # 使用正規化後的歌名+歌手作為唯一識別 (全半形、繁簡寫法視為同一首)
+            song_key = dedup_key(song_name, song_singer)
             
             if song_key not in seen_songs:
                 seen_songs[song_key] = {
@@ -204,14 +207,8 @@ class SingerScraper:
                     seen_songs[song_key]['編號資訊'].append(code_info)
         
         # 排序編號資訊（錢櫃、好樂迪、銀櫃優先）
-        priority_companies = ['錢櫃', '好樂迪', '銀櫃', '音圓', '金嗓', '弘音', '星據點', '音霸', '大東', '點將家']
-        
         for song_data in seen_songs.values():
-            song_data['編號資訊'].sort(key=lambda x: (
-                priority_companies.index(x['公司']) if x['公司'] in priority_companies else 999,
-                x['公司'],
-                x['編號']
-            ))
+            sort_code_info(song_data['編號資訊'])
         
         return list(seen_songs.values())
     
@@ -233,9 +230,9 @@ class SingerScraper:
                 '歌曲清單': songs_data
             }
             
-            # 儲存
-            with open('public/singers_data.json', 'w', encoding='utf-8') as f:
-                json.dump(all_singers_data, f, ensure_ascii=False, indent=2)
+            # 儲存，並重建壓縮檔與 manifest
+            write_json(all_singers_data, 'public/singers_data.json')
+            build_all(names=['singers_data.json'])
             
             print(f"💾 {singer_name} 的資料已儲存 ({len(songs_data)} 首歌曲)")
             return True
@@ -260,10 +257,6 @@ class SingerScraper:
                 if self.save_singer_data(singer, songs):
                     total_songs += len(songs)
                     successful_singers += 1
-                
-                # 每個歌手之間休息
-                if i < len(singer_list):
-                    time.sleep(random.uniform(3, 8))
                     
             except Exception as e:
                 print(f"❌ {singer} 收集失敗: {e}")
@@ -283,9 +276,10 @@ def main():
         print("1. 搜尋單一歌手")
         print("2. 批次搜尋多位歌手")
         print("3. 使用熱門歌手清單")
-        print("4. 退出")
+        print("4. 使用需求佇列 (依使用者查詢排序)")
+        print("5. 退出")
         
-        choice = input("\n請選擇 (1-4): ").strip()
+        choice = input("\n請選擇 (1-5): ").strip()
         
         if choice == '1':
             singer_name = input("請輸入歌手名稱: ").strip()
@@ -322,6 +316,21 @@ def main():
                 scraper.search_multiple_singers(hot_singers)
         
         elif choice == '4':
+            # query_log.py 彙整 API 查詢紀錄後產生的歌手清單
+            demand_singers = load_crawl_queue(kind='singer', limit=50)
+            if not demand_singers:
+                print("❌ 沒有需求佇列，請先執行: python3 query_log.py")
+                continue
+            
+            print(f"📈 將依需求搜尋 {len(demand_singers)} 位歌手:")
+            for i, singer in enumerate(demand_singers, 1):
+                print(f"  {i:2d}. {singer}")
+            
+            confirm = input(f"\n確定開始? (y/n): ").strip().lower()
+            if confirm == 'y':
+                scraper.search_multiple_singers(demand_singers)
+        
+        elif choice == '5':
             print("👋 再見!")
             break
         
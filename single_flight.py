@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+同鍵請求合併 (single-flight) - 同一時間相同關鍵字只送出一次上游請求
+"""
+
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self.calls = {}  # key -> 進行中的請求
+        self.lock = threading.Lock()
+        self.stats = {'executed': 0, 'coalesced': 0}
+
+    def do(self, key, fn):
+        """第一個呼叫者執行 fn()，其餘同鍵呼叫者等待並共用同一個結果"""
+        with self.lock:
+            call = self.calls.get(key)
+            if call is not None:
+                self.stats['coalesced'] += 1
+                leader = False
+            else:
+                call = _Call()
+                self.calls[key] = call
+                self.stats['executed'] += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+
+    def get_stats(self):
+        """回傳實際執行與被合併的請求數"""
+        with self.lock:
+            stats = dict(self.stats)
+            stats['in_flight'] = len(self.calls)
+        return stats
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+前綴自動完成索引 - 排序字串陣列 + 二分搜尋，熱門短前綴預先算好前 k 名
+"""
+
+import heapq
+import logging
+import time
+from bisect import bisect_left
+
+from search_index import normalize_text
+
+MAX_CHAR = '\U0010ffff'  # 比任何字元都大，用來取得前綴範圍的上界
+
+
+class SuggestIndex:
+    def __init__(self, entries, max_limit=20, scan_threshold=1000):
+        """entries: [(顯示文字, 類型, 權重)]，類型為 'song' 或 'singer'"""
+        self.max_limit = max_limit
+        self.scan_threshold = scan_threshold  # 前綴範圍超過此大小時改用預先計算的結果
+
+        merged = {}
+        for text, kind, weight in entries:
+            key = normalize_text(text)
+            if not key:
+                continue
+            if (key, kind) in merged:
+                merged[(key, kind)][2] += weight
+            else:
+                merged[(key, kind)] = [text, kind, weight]
+
+        ordered = sorted(merged.items(), key=lambda item: item[0])
+        self.keys = [key for (key, _), _ in ordered]
+        self.items = [tuple(value) for _, value in ordered]
+        self.top_prefixes = {}
+        self._precompute_heavy_prefixes()
+
+    @classmethod
+    def from_catalog(cls, catalog, **kwargs):
+        """由統一資料庫建立：歌名權重為編號數，歌手權重為歌曲數"""
+        start = time.time()
+        entries = []
+        for song in catalog.get('songs', {}).values():
+            entries.append((song.get('歌名', ''), 'song', max(len(song.get('編號資訊', [])), 1)))
+            entries.append((song.get('歌手', ''), 'singer', 1))
+        index = cls(entries, **kwargs)
+        elapsed = (time.time() - start) * 1000
+        logging.info(f"自動完成索引建立完成: {len(index.keys)} 個詞, "
+                     f"{len(index.top_prefixes)} 個預算前綴, 耗時 {elapsed:.0f} ms")
+        return index
+
+    def _weight(self, i):
+        return self.items[i][2]
+
+    def _precompute_heavy_prefixes(self):
+        """對候選過多的前綴預先挑出前 max_limit 名，查詢時不必掃描大範圍"""
+        keys = self.keys
+        length = 1
+        while True:
+            found = False
+            i = 0
+            while i < len(keys):
+                if len(keys[i]) < length:
+                    i += 1
+                    continue
+                prefix = keys[i][:length]
+                j = bisect_left(keys, prefix + MAX_CHAR, i)
+                if j - i > self.scan_threshold:
+                    self.top_prefixes[prefix] = heapq.nlargest(self.max_limit, range(i, j), key=self._weight)
+                    found = True
+                i = j
+            if not found:
+                break
+            length += 1
+
+    def suggest(self, prefix, limit=10):
+        """回傳前綴相符、權重最高的歌名與歌手"""
+        query = normalize_text(prefix)
+        if not query:
+            return []
+        limit = max(1, min(limit, self.max_limit))
+
+        top = self.top_prefixes.get(query)
+        if top is None:
+            lo = bisect_left(self.keys, query)
+            hi = bisect_left(self.keys, query + MAX_CHAR, lo)
+            top = heapq.nlargest(limit, range(lo, hi), key=self._weight)
+
+        return [
+            {'text': text, 'type': kind, 'count': weight}
+            for text, kind, weight in (self.items[i] for i in top[:limit])
+        ]
@@ -11,6 +11,9 @@ import sys
 import time
 from urllib.parse import quote
 
+from crawl_cache import get_crawl_cache, request_songs
+from upstream_client import UpstreamError
+
 def search_taiwan_ktv(keyword):
     """搜尋台灣點歌王"""
     
@@ -44,48 +47,38 @@ def search_taiwan_ktv(keyword):
             'keyword': keyword
         }
         
-        # 發送請求
-        response = session.get(api_url, params=params, timeout=15)
+        # 先查爬蟲快取，未命中才向點歌王發送請求 (失敗的回應不寫入快取)
+        crawl_cache = get_crawl_cache()
+        data = crawl_cache.fetch(keyword, params['company'], params['cusType'],
+                                 lambda: request_songs(session, api_url, params, timeout=15))
         
-        print(f"📄 回應狀態: {response.status_code}")
-        print(f"📄 Content-Type: {response.headers.get('content-type', 'unknown')}")
+        source = "爬蟲快取" if crawl_cache.get_stats()['hits'] else "台灣點歌王"
+        print(f"✅ 搜尋成功 ({source}): 找到 {len(data)} 首歌曲")
+        
+        # 轉換資料格式
+        results = []
+        for song in data:
+            result = {
+                'name': song.get('name', ''),
+                'singer': song.get('singer', ''),
+                'code': song.get('code', ''),
+                'company': song.get('company', ''),
+                'lang': song.get('lang', ''),
+                'sex': song.get('sex', ''),
+            }
+            results.append(result)
+        
+        return results
+    
+    except UpstreamError as e:
+        # HTTP 錯誤、非陣列回應或重播模式下快取未命中
+        print(f"❌ API請求失敗: {e}")
+        return []
+    
+    except ValueError as e:
+        print(f"❌ JSON解析失敗: {e}")
+        return []
         
-        if response.status_code == 200:
-            try:
-                # 解析JSON回應
-                data = response.json()
-                
-                if isinstance(data, list):
-                    print(f"✅ 搜尋成功: 找到 {len(data)} 首歌曲")
-                    
-                    # 轉換資料格式
-                    results = []
-                    for song in data:
-                        result = {
-                            'name': song.get('name', ''),
-                            'singer': song.get('singer', ''),
-                            'code': song.get('code', ''),
-                            'company': song.get('company', ''),
-                            'lang': song.get('lang', ''),
-                            'sex': song.get('sex', ''),
-                        }
-                        results.append(result)
-                    
-                    return results
-                else:
-                    print(f"⚠️ 回傳資料不是陣列格式: {type(data)}")
-                    return []
-                    
-            except json.JSONDecodeError as e:
-                print(f"❌ JSON解析失敗: {e}")
-                print(f"📄 原始回應: {response.text[:200]}...")
-                return []
-                
-        else:
-            print(f"❌ API請求失敗: HTTP {response.status_code}")
-            print(f"📄 錯誤回應: {response.text[:200]}...")
-            return []
-            
     except requests.exceptions.RequestException as e:
         print(f"❌ 網路請求錯誤: {e}")
         return []
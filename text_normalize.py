@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+文字正規化 - 繁簡與異體字摺疊、NFKC 全半形統一、大小寫摺疊
+建索引時與查詢時套用同一套規則，查詢不必再逐一嘗試各種寫法
+"""
+
+import unicodedata
+
+# 繁體/異體字 -> 簡體的對照 (每兩個字一組)，摺疊後 台/臺、周杰倫/周杰伦 會得到相同的鍵
+VARIANT_PAIRS = (
+    '愛爱罷罢備备貝贝筆笔畢毕邊边變变賓宾標标別别補补參参蠶蚕燦灿層层產产長长場场嘗尝'
+    '腸肠廠厂車车徹彻塵尘陳陈稱称懲惩遲迟齒齿衝冲蟲虫寵宠籌筹醜丑處处觸触傳传創创純纯'
+    '詞词辭辞從从聰聪叢丛錯错達达帶带單单擔担膽胆彈弹當当黨党導导島岛燈灯敵敌遞递點点'
+    '電电釣钓調调疊叠頂顶東东動动凍冻鬥斗獨独讀读斷断對对隊队頓顿奪夺墮堕兒儿爾尔發发'
+    '罰罚髮发範范飛飞廢废費费紛纷墳坟奮奋豐丰風风鳳凤膚肤婦妇復复複复負负該该蓋盖幹干'
+    '趕赶剛刚鋼钢綱纲崗岗個个閣阁鞏巩貢贡溝沟構构購购顧顾關关觀观館馆慣惯廣广歸归龜龟'
+    '國国過过漢汉號号鶴鹤賀贺紅红後后護护畫画劃划話话懷怀壞坏歡欢環环還还換换喚唤黃黄'
+    '揮挥輝辉會会繪绘匯汇彙汇渾浑夥伙獲获貨货禍祸擊击機机積积極极幾几際际計计記记紀纪'
+    '濟济繼继夾夹價价駕驾間间艱艰堅坚檢检簡简見见劍剑漸渐講讲將将獎奖膠胶驕骄嬌娇腳脚'
+    '攪搅轎轿較较階阶節节結结傑杰潔洁屆届緊紧僅仅進进盡尽勁劲經经驚惊鏡镜競竞舊旧舉举'
+    '劇剧據据懼惧絕绝覺觉軍军開开殼壳課课墾垦懇恳誇夸塊块寬宽礦矿虧亏擴扩來来蘭兰藍蓝'
+    '攔拦欄栏爛烂懶懒勞劳淚泪類类離离裡里裏里禮礼麗丽歷历曆历厲厉勵励憐怜聯联連连戀恋'
+    '煉炼練练糧粮兩两輛辆諒谅療疗遼辽獵猎臨临鄰邻靈灵嶺岭齡龄領领劉刘龍龙樓楼蘆芦爐炉'
+    '陸陆錄录綠绿亂乱輪轮論论羅罗鑼锣邏逻馬马媽妈嗎吗罵骂買买賣卖麥麦滿满貓猫門门們们'
+    '夢梦彌弥綿绵麵面廟庙滅灭鳴鸣謀谋畝亩納纳難难腦脑惱恼鬧闹內内擬拟鳥鸟聶聂寧宁農农'
+    '濃浓諾诺歐欧盤盘賠赔噴喷鵬鹏騙骗飄飘頻频貧贫憑凭蘋苹評评撲扑樸朴齊齐騎骑豈岂啟启'
+    '氣气棄弃遷迁簽签錢钱淺浅牆墙槍枪強强搶抢橋桥親亲輕轻傾倾慶庆窮穷區区軀躯驅驱權权'
+    '勸劝確确讓让擾扰熱热認认榮荣軟软銳锐潤润灑洒賽赛傘伞喪丧掃扫殺杀紗纱傷伤燒烧紹绍'
+    '設设攝摄審审嬸婶腎肾聲声繩绳勝胜聖圣師师詩诗時时識识實实勢势視视試试飾饰適适釋释'
+    '壽寿獸兽書书術术樹树數数雙双誰谁順顺說说碩硕絲丝飼饲鬆松聳耸頌颂訴诉肅肃雖虽歲岁'
+    '孫孙損损縮缩鎖锁臺台颱台態态攤摊談谈歎叹嘆叹湯汤燙烫濤涛討讨騰腾題题體体條条鐵铁'
+    '聽听廳厅頭头圖图塗涂團团脫脱駝驼襪袜灣湾萬万網网為为爲为偉伟圍围違违衛卫衞卫謂谓'
+    '溫温聞闻紋纹穩稳問问窩窝臥卧烏乌無无誤误務务霧雾係系繫系戲戏細细蝦虾轄辖嚇吓鮮鲜'
+    '閑闲閒闲顯显險险線线綫线現现獻献縣县憲宪鄉乡詳详響响項项蕭萧銷销曉晓嘯啸協协脅胁'
+    '寫写謝谢興兴選选學学尋寻詢询訓训訊讯遜逊壓压鴨鸭啞哑亞亚訝讶煙烟鹽盐嚴严顏颜豔艳'
+    '艷艳驗验陽阳揚扬楊杨養养樣样遙遥搖摇藥药爺爷頁页業业葉叶醫医儀仪億亿憶忆藝艺議议'
+    '譯译異异陰阴銀银飲饮隱隐應应營营贏赢擁拥傭佣湧涌詠咏優优憂忧郵邮猶犹遊游誘诱魚鱼'
+    '漁渔娛娱與与語语獄狱預预園园員员圓圆緣缘遠远願愿約约躍跃鑰钥嶽岳雲云運运韻韵雜杂'
+    '災灾載载讚赞贊赞臟脏髒脏鑿凿棗枣竈灶責责擇择澤泽賊贼贈赠紮扎閘闸詐诈齋斋債债氈毡'
+    '盞盏斬斩輾辗嶄崭棧栈戰战張张漲涨帳帐賬账脹胀趙赵這这針针偵侦陣阵鎮镇爭争掙挣睜睁'
+    '徵征證证鄭郑執执職职紙纸誌志製制滯滞質质鐘钟鍾钟終终種种眾众衆众週周軸轴皺皱晝昼'
+    '豬猪諸诸燭烛矚瞩囑嘱註注築筑鑄铸專专磚砖轉转賺赚樁桩莊庄裝装壯壮狀状錐锥準准濁浊'
+    '資资漬渍蹤踪總总縱纵鄒邹組组鑽钻倫伦淪沦奧奥瑋玮燁烨鄧邓蔣蒋蘇苏賴赖韓韩盧卢馮冯'
+    '許许呂吕譚谭閻阎龔龚華华萊莱瑩莹婭娅縈萦靜静綺绮彥彦韋韦賢贤峯峰煒炜暉晖嵐岚瀾澜'
+    '錦锦綸纶樂乐給给麼么癡痴纏缠綁绑縷缕編编織织驟骤訂订騷骚擠挤獅狮鯨鲸螢萤鷹鹰鴿鸽'
+    '蓮莲薔蔷葦苇滷卤餅饼飯饭餓饿飽饱鍋锅瓊琼閃闪閱阅闖闯闊阔闢辟隨随隸隶雞鸡雛雏韌韧'
+    '頸颈額额顆颗颳刮飆飙饒饶駛驶驢驴鬱郁鯉鲤鹹咸黴霉齣出嘩哗囉啰嗚呜嘰叽噹当嚕噜殘残'
+    '謊谎誠诚請请謎谜敗败輸输贖赎貼贴貴贵賞赏財财貪贪貫贯跡迹蹟迹踐践軌轨輩辈轟轰辦办'
+    '遺遗邁迈醞酝釀酿鈴铃銘铭鋒锋錶表鍵键鏈链鐲镯閉闭靂雳須须鬚须顛颠顫颤颯飒餘余馳驰'
+    '鬍胡鴛鸳鴦鸯鵝鹅鶯莺籃篮糾纠級级絡络統统綜综維维緒绪緩缓緻致績绩繞绕續续罈坛壇坛'
+    '脈脉臉脸簾帘籤签蟬蝉蠟蜡襯衬訪访譜谱譽誉賤贱賦赋趨趋駐驻於于着著'
+)
+
+
+def _build_fold_table():
+    pairs = ''.join(VARIANT_PAIRS)
+    return {ord(pairs[i]): pairs[i + 1] for i in range(0, len(pairs), 2)}
+
+
+FOLD_TABLE = _build_fold_table()
+
+
+def fold_variants(text):
+    """只做繁簡與異體字摺疊"""
+    return text.translate(FOLD_TABLE)
+
+
+def normalize(text):
+    """NFKC (全形轉半形) -> 大小寫摺疊 -> 繁簡摺疊，並將連續空白合併成一個"""
+    text = unicodedata.normalize('NFKC', str(text)).casefold()
+    return ' '.join(fold_variants(text).split())
+
+
+def dedup_key(*parts):
+    """合併重複歌曲用的鍵 (例如歌名 + 歌手)"""
+    return '_'.join(normalize(part) for part in parts)
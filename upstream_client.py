@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+台灣點歌王上游客戶端 - 共用的 keep-alive 連線池，每個請求獨立的標頭
+同時提供同步與 asyncio 介面，供 Flask 路由與爬蟲共用
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from urllib.parse import quote
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import UPSTREAM_ERRORS, UPSTREAM_LATENCY, UPSTREAM_RESPONSES, UPSTREAM_TIMEOUTS
+
+BASE_URL = 'https://song.corp.com.tw'
+SEARCH_PATH = '/api/song.aspx'
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'application/json, text/javascript, */*; q=0.01',
+    'Accept-Language': 'zh-TW,zh;q=0.9,en-US;q=0.8,en;q=0.7',
+    'Referer': f'{BASE_URL}/',
+    'X-Requested-With': 'XMLHttpRequest',
+    'Connection': 'keep-alive',
+}
+
+
+class UpstreamError(Exception):
+    """點歌王回應異常 (HTTP 錯誤或格式錯誤)，訊息可直接回傳給前端"""
+
+
+class UpstreamClient:
+    def __init__(self, pool_size=10, base_url=BASE_URL):
+        self.base_url = base_url
+        self.pool_size = pool_size
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+
+        # 連線池大小需涵蓋同時送出的請求數，否則多出的連線用完即關閉
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self.executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix='upstream')
+
+    def build_headers(self, keyword, company='全部'):
+        """每個請求獨立的標頭 (不修改共用的 session 標頭)"""
+        return {
+            'Referer': f"{self.base_url}/songs.aspx?company={quote(company)}&keyword={quote(keyword)}"
+        }
+
+    def warm_up(self, timeout=10):
+        """先訪問首頁建立 TLS 連線並取得 cookie"""
+        try:
+            response = self.session.get(self.base_url, timeout=timeout)
+            logging.info(f"上游連線預熱狀態碼: {response.status_code}")
+            return response.status_code == 200
+        except Exception as e:
+            logging.warning(f"上游連線預熱失敗: {str(e)}")
+            return False
+
+    def search(self, keyword, company='全部', cus_type='searchList', timeout=15):
+        """查詢 song.aspx 並回傳原始歌曲陣列，失敗時拋出例外"""
+        params = {
+            'company': company,
+            'cusType': cus_type,
+            'keyword': keyword
+        }
+
+        logging.info(f"正在搜尋台灣點歌王: {keyword} ({company}/{cus_type})")
+
+        endpoint = 'song.aspx'
+        start = time.perf_counter()
+        try:
+            response = self.session.get(
+                f"{self.base_url}{SEARCH_PATH}",
+                params=params,
+                headers=self.build_headers(keyword, company),
+                timeout=timeout
+            )
+        except requests.exceptions.Timeout:
+            UPSTREAM_TIMEOUTS.inc(endpoint=endpoint)
+            raise
+        except requests.exceptions.RequestException:
+            UPSTREAM_ERRORS.inc(endpoint=endpoint, reason='connection')
+            raise
+        finally:
+            UPSTREAM_LATENCY.observe(time.perf_counter() - start, endpoint=endpoint)
+
+        UPSTREAM_RESPONSES.inc(endpoint=endpoint, status=str(response.status_code))
+        if response.status_code != 200:
+            logging.error(f"台灣點歌王API請求失敗: HTTP {response.status_code}")
+            raise UpstreamError(f'台灣點歌王API請求失敗: HTTP {response.status_code}')
+
+        try:
+            data = response.json()
+        except ValueError as json_error:
+            UPSTREAM_ERRORS.inc(endpoint=endpoint, reason='parse')
+            logging.error(f"台灣點歌王回傳資料解析失敗: {str(json_error)}")
+            raise UpstreamError('搜尋結果解析失敗')
+
+        if not isinstance(data, list):
+            UPSTREAM_ERRORS.inc(endpoint=endpoint, reason='format')
+            logging.warning(f"台灣點歌王回傳非陣列資料: {type(data)}")
+            raise UpstreamError('搜尋結果格式錯誤')
+
+        return data
+
+    async def async_search(self, keyword, company='全部', cus_type='searchList', timeout=15):
+        """search() 的 asyncio 版本，在連線池專用執行緒中送出請求"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor,
+            partial(self.search, keyword, company=company, cus_type=cus_type, timeout=timeout)
+        )
+
+    def close(self):
+        """關閉連線池與執行緒"""
+        self.executor.shutdown(wait=False)
+        self.session.close()
+
+
+_default_client = None
+_default_lock = threading.Lock()
+
+
+def get_client():
+    """取得行程內共用的上游客戶端"""
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = UpstreamClient()
+        return _default_client
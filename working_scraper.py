@@ -11,6 +11,54 @@ import time
 import random
 from datetime import datetime
 import subprocess
+from artifacts import build_all
+from catalog import sort_code_info, write_json
+
+def song_key_for(song_data):
+    """統一資料庫中歌曲的鍵 (歌名_歌手)"""
+    return f"{song_data['歌名']}_{song_data['歌手']}"
+
+def merge_song_into_db(unified_db, song_data):
+    """將一筆歌曲編號合併進統一資料庫，有新增歌曲或編號時回傳 True"""
+    song_key = song_key_for(song_data)
+    
+    # 檢查是否已存在
+    if song_key in unified_db['songs']:
+        # 檢查是否有新的編號資訊
+        existing_codes = {(code['公司'], code['編號']) for code in unified_db['songs'][song_key]['編號資訊']}
+        new_code = (song_data['公司'], song_data['編號'])
+        
+        if new_code not in existing_codes:
+            # 添加新編號
+            unified_db['songs'][song_key]['編號資訊'].append({
+                '公司': song_data['公司'],
+                '編號': song_data['編號']
+            })
+            return True
+    else:
+        # 新增歌曲
+        unified_db['songs'][song_key] = {
+            '歌名': song_data['歌名'],
+            '歌手': song_data['歌手'], 
+            '語言': song_data.get('語言', ''),
+            '編號資訊': [{
+                '公司': song_data['公司'],
+                '編號': song_data['編號']
+            }]
+        }
+        
+        # 更新統計
+        unified_db['metadata']['total_songs'] += 1
+        if song_data['歌手'] not in unified_db['metadata']['singers']:
+            unified_db['metadata']['singers'].append(song_data['歌手'])
+            unified_db['metadata']['total_singers'] += 1
+            
+        if song_data['公司'] not in unified_db['metadata']['companies']:
+            unified_db['metadata']['companies'].append(song_data['公司'])
+            
+        return True
+        
+    return False
 
 class WorkingScraper:
     def __init__(self):
@@ -87,56 +135,20 @@ class WorkingScraper:
     
     def add_song_to_database(self, song_data):
         """添加歌曲到統一資料庫"""
-        song_key = f"{song_data['歌名']}_{song_data['歌手']}"
-        
-        # 檢查是否已存在
-        if song_key in self.unified_db['songs']:
-            # 檢查是否有新的編號資訊
-            existing_codes = {(code['公司'], code['編號']) for code in self.unified_db['songs'][song_key]['編號資訊']}
-            new_code = (song_data['公司'], song_data['編號'])
-            
-            if new_code not in existing_codes:
-                # 添加新編號
-                self.unified_db['songs'][song_key]['編號資訊'].append({
-                    '公司': song_data['公司'],
-                    '編號': song_data['編號']
-                })
-                return True
-        else:
-            # 新增歌曲
-            self.unified_db['songs'][song_key] = {
-                '歌名': song_data['歌名'],
-                '歌手': song_data['歌手'], 
-                '語言': song_data.get('語言', ''),
-                '編號資訊': [{
-                    '公司': song_data['公司'],
-                    '編號': song_data['編號']
-                }]
-            }
-            
-            # 更新統計
-            self.unified_db['metadata']['total_songs'] += 1
-            if song_data['歌手'] not in self.unified_db['metadata']['singers']:
-                self.unified_db['metadata']['singers'].append(song_data['歌手'])
-                self.unified_db['metadata']['total_singers'] += 1
-                
-            if song_data['公司'] not in self.unified_db['metadata']['companies']:
-                self.unified_db['metadata']['companies'].append(song_data['公司'])
-                
-            return True
-            
-        return False
+        return merge_song_into_db(self.unified_db, song_data)
     
     def save_database(self):
         """保存統一資料庫"""
         self.unified_db['metadata']['最後更新時間'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         
-        with open(self.unified_db_path, 'w', encoding='utf-8') as f:
-            json.dump(self.unified_db, f, ensure_ascii=False, indent=2)
+        write_json(self.unified_db, self.unified_db_path)
         
         # 生成前端相容檔案
         self.generate_frontend_files()
         
+        # 產生壓縮版本與 ETag
+        build_all()
+        
         print(f"💾 資料庫已保存: {self.unified_db['metadata']['total_songs']:,} 首歌曲")
         return True
     
@@ -173,15 +185,12 @@ class WorkingScraper:
                     '歌名': song_data['歌名'],
                     '歌手': singer,
                     '語言': song_data.get('語言', ''),
-                    '編號資訊': song_data['編號資訊'].copy()
+                    '編號資訊': sort_code_info(song_data['編號資訊'].copy())
                 })
         
         # 保存檔案
-        with open('public/songs_simplified.json', 'w', encoding='utf-8') as f:
-            json.dump(songs_simplified, f, ensure_ascii=False, indent=2)
-            
-        with open('public/singers_data.json', 'w', encoding='utf-8') as f:
-            json.dump(singers_data, f, ensure_ascii=False, indent=2)
+        write_json(songs_simplified, 'public/songs_simplified.json')
+        write_json(singers_data, 'public/singers_data.json')
         
         print(f"📄 前端檔案已更新:")
         print(f"   songs_simplified.json: {len(songs_simplified):,} 筆記錄")
@@ -194,8 +203,14 @@ class WorkingScraper:
             files_to_add = [
                 'public/unified_karaoke_db.json',
                 'public/songs_simplified.json',
-                'public/singers_data.json'
+                'public/singers_data.json',
+                'public/artifacts_manifest.json'
             ]
+            # 預先壓縮的版本 (.br 需要安裝 brotli 才會產生)
+            for name in files_to_add[:3]:
+                for suffix in ('.gz', '.br'):
+                    if os.path.exists(name + suffix):
+                        files_to_add.append(name + suffix)
             
             subprocess.run(['git', 'add'] + files_to_add, check=True)
             